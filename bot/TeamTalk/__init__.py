@@ -1,12 +1,15 @@
 from __future__ import annotations
+import ctypes
 import logging
 import os
 import re
 import sys
-from typing import AnyStr, List, TYPE_CHECKING, Optional, Union
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, AnyStr, Callable, List, TYPE_CHECKING, Optional, Union
 from queue import Queue
 
-from bot import app_vars
+from bot import app_vars, errors
 from bot.sound_devices import SoundDevice, SoundDeviceType
 
 
@@ -16,6 +19,8 @@ if sys.platform == "win32":
     else:
         os.chdir(app_vars.directory)
 
+from bot.TeamTalk.correlation import EventRegistry
+from bot.TeamTalk.sender import MessageSender, split
 from bot.TeamTalk.thread import TeamTalkThread
 from bot.TeamTalk.structs import *
 
@@ -24,6 +29,9 @@ import TeamTalkPy
 
 re_line_endings = re.compile("[\\r\\n]")
 
+# Speex band modes: narrowband, wideband and ultra-wideband
+speex_sample_rates = (8000, 16000, 32000)
+
 if TYPE_CHECKING:
     from bot import Bot
 
@@ -38,42 +46,11 @@ def _str(data: AnyStr) -> AnyStr:
         return str(data, "utf-8")
 
 
-def split(text: str, max_length: int = app_vars.max_message_length) -> List[str]:
-    if len(text) <= max_length:
-        lines = [text]
-    else:
-        lines = [""]
-        for line in text.split("\n"):
-            if len(line) <= max_length:
-                if len(lines[-1]) > 0 and len(lines[-1]) + len(line) + 1 <= max_length:
-                    lines[-1] += "\n" + line
-                elif len(lines) == 1 and len(lines[0]) == 0:
-                    lines[0] = line
-                else:
-                    lines.append(line)
-            else:
-                words = [""]
-                for word in line.split(" "):
-                    if len(word) <= max_length:
-                        if (
-                            len(words[-1]) > 0
-                            and len(words[-1]) + len(word) + 1 <= max_length
-                        ):
-                            words[-1] += " " + word
-                        elif len(words) == 1 and len(words[0]) == 0:
-                            words[0] == word
-                        else:
-                            words.append(word)
-                    else:
-                        chunk = word
-                        for _ in range(0, int(len(chunk) / max_length) + 1):
-                            words.append(chunk[0:max_length])
-                            chunk = chunk[max_length::]
-                lines += words
-    return lines
-
-
 class TeamTalk:
+    # Seconds to wait for a command's result, and for an upload to show up
+    command_timeout = 30
+    upload_timeout = 1800
+
     def __init__(self, bot: Bot) -> None:
         self.config = bot.config.teamtalk
         self.translator = bot.translator
@@ -86,25 +63,31 @@ class TeamTalk:
         self.nickname = self.config.nickname
         self.gender = UserStatusMode.__members__[self.config.gender.upper()]
         self.status = self.default_status
-        self.errors_queue: Queue[Error] = Queue()
-        self.event_success_queue: Queue[Event] = Queue()
+        self.event_registry = EventRegistry()
         self.message_queue: Queue[Message] = Queue()
         self.myself_event_queue: Queue[Event] = Queue()
-        self.uploaded_files_queue: Queue[File] = Queue()
         self.thread = TeamTalkThread(bot, self)
+        self.message_sender = MessageSender(self)
         self.reconnect = False
         self.reconnect_attempt = 0
         self.user_account: UserAccount
+        self._user_id: Optional[int] = None
+        self._channel_id: Optional[int] = None
+        # Bumped on every invalidation, so a fetch that raced one isn't stored
+        self._self_generation = 0
+        self._self_lock = threading.Lock()
 
     def initialize(self) -> None:
         logging.debug("Initializing TeamTalk")
         self.thread.start()
+        self.message_sender.start()
         self.connect()
         logging.debug("TeamTalk initialized")
 
     def close(self) -> None:
         logging.debug("Closing teamtalk")
         self.thread.close()
+        self.message_sender.close()
         self.disconnect()
         self.state = State.NOT_CONNECTED
         self.tt.closeTeamTalk()
@@ -147,6 +130,7 @@ class TeamTalk:
     def disconnect(self) -> None:
         self.tt.disconnect()
         self.state = State.NOT_CONNECTED
+        self.invalidate_self()
 
     def login(self) -> None:
         self.tt.doLogin(
@@ -173,21 +157,23 @@ class TeamTalk:
             return self.translator.translate('Send "h" for help')
 
     def send_message(
-        self, text: str, user: Optional[User] = None, type: int = 1
+        self, text: str, user: Optional[Union[User, int]] = None, type: int = 1
     ) -> None:
-        for string in split(text):
-            message = TeamTalkPy.TextMessage()
-            message.nFromUserID = self.tt.getMyUserID()
-            message.nMsgType = type
-            message.szMessage = _str(string)
-            if type == 1:
-                if isinstance(user, int):
-                    message.nToUserID = user
-                else:
-                    message.nToUserID = user.id
-            elif type == 2:
-                message.nChannelID = self.tt.getMyChannelID()
-            self.tt.doTextMessage(message)
+        recipient = 0
+        if type == 1:
+            recipient = user if isinstance(user, int) else user.id
+        self.message_sender.put(recipient, text, type)
+
+    def send_text_message(self, text: str, recipient: int, type: int) -> None:
+        message = TeamTalkPy.TextMessage()
+        message.nFromUserID = self.tt.getMyUserID()
+        message.nMsgType = type
+        message.szMessage = _str(text)
+        if type == 1:
+            message.nToUserID = recipient
+        elif type == 2:
+            message.nChannelID = self.tt.getMyChannelID()
+        self.tt.doTextMessage(message)
 
     def send_file(self, channel: Union[int, str], file_path: str):
         if isinstance(channel, int):
@@ -198,6 +184,34 @@ class TeamTalk:
                 raise ValueError()
         return self.tt.doSendFile(channel_id, _str(file_path))
 
+    def upload_file(
+        self,
+        channel: Union[int, str],
+        file_path: str,
+        timeout: Optional[float] = upload_timeout,
+    ) -> File:
+        with self.event_registry.registering():
+            command_id = self.send_file(channel, file_path)
+            future = self.event_registry.expect_file(
+                os.path.basename(file_path), command_id
+            )
+        return self._wait(future, timeout)
+
+    def run_command(
+        self, send: Callable[[], int], timeout: Optional[float] = command_timeout
+    ) -> Event:
+        """Sends a command with send and waits for its result."""
+        with self.event_registry.registering():
+            future = self.event_registry.expect_command(send())
+        return self._wait(future, timeout)
+
+    def _wait(self, future: Future[Any], timeout: Optional[float]) -> Any:
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise errors.TTEventError("Timed out")
+
     def delete_file(self, channel: Union[int, str], file_id: int) -> int:
         if isinstance(channel, int):
             channel_id = channel
@@ -251,10 +265,41 @@ class TeamTalk:
                 obj.szTopic,
                 obj.nMaxUsers,
                 ChannelType(obj.uChannelType),
+                self.get_audio_codec(obj.audiocodec),
             )
         except ValueError:
             return Channel(0, "", "", 0, ChannelType.Default)
 
+    def get_audio_codec(self, obj: TeamTalkPy.AudioCodec) -> Optional[AudioCodec]:
+        if obj.nCodec == TeamTalkPy.Codec.OPUS_CODEC:
+            opus = obj.u.opus
+            return AudioCodec(
+                obj.nCodec,
+                opus.nSampleRate,
+                opus.nChannels,
+                opus.nBitRate,
+                opus.nTxIntervalMSec,
+            )
+        elif obj.nCodec == TeamTalkPy.Codec.SPEEX_CODEC:
+            speex = obj.u.speex
+            return AudioCodec(
+                obj.nCodec,
+                speex_sample_rates[speex.nBandmode],
+                1,
+                None,
+                speex.nTxIntervalMSec,
+            )
+        elif obj.nCodec == TeamTalkPy.Codec.SPEEX_VBR_CODEC:
+            speex = obj.u.speex_vbr
+            return AudioCodec(
+                obj.nCodec,
+                speex_sample_rates[speex.nBandmode],
+                1,
+                speex.nBitRate,
+                speex.nTxIntervalMSec,
+            )
+        return None
+
     @property
     def flags(self) -> Flags:
         return Flags(self.tt.getFlags())
@@ -288,13 +333,40 @@ class TeamTalk:
 
     @property
     def user(self) -> User:
-        user = self.get_user(self.tt.getMyUserID())
+        user = self.get_user(self.user_id)
         user.user_account = self.user_account
         return user
 
     @property
     def channel(self) -> Channel:
-        return self.get_channel(self.tt.getMyChannelID())
+        return self.get_channel(self.channel_id)
+
+    @property
+    def user_id(self) -> int:
+        # Cached until TeamTalkThread sees an event that changes it
+        return self._get_cached("_user_id", self.tt.getMyUserID)
+
+    @property
+    def channel_id(self) -> int:
+        return self._get_cached("_channel_id", self.tt.getMyChannelID)
+
+    def _get_cached(self, name: str, fetch: Callable[[], int]) -> int:
+        with self._self_lock:
+            value = getattr(self, name)
+            generation = self._self_generation
+        if value is not None:
+            return value
+        value = fetch()
+        with self._self_lock:
+            if self._self_generation == generation:
+                setattr(self, name, value)
+        return value
+
+    def invalidate_self(self) -> None:
+        with self._self_lock:
+            self._self_generation += 1
+            self._user_id = None
+            self._channel_id = None
 
     def get_user(self, id: int) -> User:
         user = self.tt.getUser(id)
@@ -409,6 +481,22 @@ class TeamTalk:
     def set_input_device(self, id: int) -> None:
         self.tt.initSoundInputDevice(id)
 
+    def insert_audio_block(
+        self, data: bytes, sample_rate: int, channels: int, sample_index: int
+    ) -> bool:
+        """Queues 16 bit PCM for transmission as voice, bypassing the input device."""
+        buffer = ctypes.create_string_buffer(data, len(data))
+        block = TeamTalkPy.AudioBlock()
+        block.nStreamID = TeamTalkPy.StreamType.STREAMTYPE_VOICE
+        block.nSampleRate = sample_rate
+        block.nChannels = channels
+        block.lpRawAudio = ctypes.cast(buffer, ctypes.c_void_p)
+        block.nSamples = len(data) // (2 * channels)
+        block.uSampleIndex = sample_index & 0xFFFFFFFF
+        return bool(
+            TeamTalkPy.TeamTalk5._InsertAudioBlock(self.tt._tt, ctypes.byref(block))
+        )
+
     def enable_voice_transmission(self) -> None:
         self.tt.enableVoiceTransmission(True)
         self.is_voice_transmission_enabled = True
@@ -0,0 +1,86 @@
+from __future__ import annotations
+from concurrent.futures import Future
+from contextlib import contextmanager
+import threading
+from typing import Any, Dict, Hashable, Iterator, List, Tuple, TYPE_CHECKING
+
+from bot import errors
+
+if TYPE_CHECKING:
+    from bot.TeamTalk.structs import Error, Event, File
+
+
+class EventRegistry:
+    """Hands command and file results from the event thread to whoever waits for them.
+
+    Results no one is waiting for are dropped, so a command must be sent and
+    registered for inside ``registering()``, or its result may arrive first.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._waiters: Dict[Hashable, List[Future[Any]]] = {}
+
+    @contextmanager
+    def registering(self) -> Iterator[None]:
+        """Holds results back until the block has registered for its command."""
+        with self._lock:
+            yield
+
+    def expect_command(self, command_id: int) -> Future[Event]:
+        return self._expect(("success", command_id), ("error", command_id))
+
+    def expect_file(self, file_name: str, command_id: int) -> Future[File]:
+        return self._expect(("file", file_name), ("error", command_id))
+
+    def complete_command(self, event: Event) -> None:
+        self._resolve(("success", event.source), event, False)
+
+    def complete_file(self, file: File) -> None:
+        self._resolve(("file", file.name), file, False)
+
+    def fail_command(self, error: Error) -> None:
+        self._resolve(
+            ("error", error.command_id), errors.TTEventError(error.message), True
+        )
+
+    def fail_all(self, message: str) -> None:
+        with self._lock:
+            futures = {id(f): f for w in self._waiters.values() for f in w}
+            self._waiters.clear()
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(errors.TTEventError(message))
+
+    def _expect(self, *keys: Hashable) -> Future[Any]:
+        future: Future[Any] = Future()
+        with self._lock:
+            for key in keys:
+                self._waiters.setdefault(key, []).append(future)
+        # Also runs on cancel(), so a caller that gave up leaves nothing behind
+        future.add_done_callback(lambda f: self._discard(f, keys))
+        return future
+
+    def _resolve(self, key: Hashable, result: Any, is_error: bool) -> None:
+        with self._lock:
+            for future in self._waiters.get(key, []):
+                if not future.done():
+                    self._set(future, result, is_error)
+                    return
+
+    def _set(self, future: Future[Any], result: Any, is_error: bool) -> None:
+        if is_error:
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    def _discard(self, future: Future[Any], keys: Tuple[Hashable, ...]) -> None:
+        with self._lock:
+            for key in keys:
+                waiters = self._waiters.get(key)
+                if not waiters:
+                    continue
+                if future in waiters:
+                    waiters.remove(future)
+                if not waiters:
+                    del self._waiters[key]
@@ -0,0 +1,181 @@
+from __future__ import annotations
+from collections import deque
+import logging
+from threading import Condition, Thread
+import time
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from bot import app_vars
+
+if TYPE_CHECKING:
+    from bot.TeamTalk import TeamTalk
+
+
+# (recipient, text, message type); the recipient is a user ID for private
+# messages and 0 for the channel
+OutgoingMessage = Tuple[int, str, int]
+
+
+def _byte_length(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def _split_word(word: str, max_length: int, max_bytes: int) -> Iterator[str]:
+    start = 0
+    while start < len(word):
+        part = word[start : start + max_length]
+        encoded = part.encode("utf-8")
+        if len(encoded) > max_bytes:
+            # Cut at the byte limit, stepping back to the start of a character
+            cut = max_bytes
+            while encoded[cut] & 0xC0 == 0x80:
+                cut -= 1
+            part = encoded[:cut].decode("utf-8")
+        yield part
+        start += len(part)
+
+
+def split(
+    text: str,
+    max_length: int = app_vars.max_message_length,
+    max_bytes: int = app_vars.max_message_bytes,
+) -> List[str]:
+    """Splits text into messages of at most max_length characters and max_bytes
+    UTF-8 bytes.
+
+    Lines are packed into a message while they fit. A line that doesn't fit
+    anywhere is packed word by word, and a word that is still too long is cut.
+    """
+    if len(text) <= max_length and _byte_length(text) <= max_bytes:
+        return [text]
+    chunks: List[str] = []
+    pieces: List[str] = []
+    length = 0
+    size = 0
+    for line_number, line in enumerate(text.split("\n")):
+        line_length = len(line)
+        line_size = _byte_length(line)
+        if line_length <= max_length and line_size <= max_bytes:
+            tokens: Iterable[Tuple[str, int, int]] = ((line, line_length, line_size),)
+        else:
+            tokens = (
+                (part, len(part), _byte_length(part))
+                for word in line.split(" ")
+                for part in (
+                    (word,)
+                    if len(word) <= max_length and _byte_length(word) <= max_bytes
+                    else _split_word(word, max_length, max_bytes)
+                )
+            )
+        separator = "\n" if line_number else ""
+        for token, token_length, token_size in tokens:
+            if (
+                pieces
+                and length + 1 + token_length <= max_length
+                and size + 1 + token_size <= max_bytes
+            ):
+                pieces.append(separator)
+                pieces.append(token)
+                length += 1 + token_length
+                size += 1 + token_size
+            else:
+                if pieces:
+                    chunks.append("".join(pieces))
+                # A message never starts with an empty line or word
+                pieces = [token] if token else []
+                length = token_length
+                size = token_size
+            separator = " "
+    if pieces:
+        chunks.append("".join(pieces))
+    return chunks
+
+
+class MessageSender(Thread):
+    """Sends text messages from a single thread.
+
+    Callers only enqueue. Private messages, which are mostly command replies, go
+    out before channel notices. Queued messages to the same recipient are merged
+    as long as the result still fits into one TeamTalk message, and every message
+    sent takes a token from a bucket sized after the server's flood limits.
+    """
+
+    def __init__(self, ttclient: TeamTalk) -> None:
+        super().__init__(daemon=True)
+        self.name = "MessageSenderThread"
+        self.ttclient = ttclient
+        self.rate = ttclient.config.messages_per_second
+        self.burst = max(1, ttclient.config.message_burst)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        # Index is the priority, lower goes first
+        self._queues: List[Deque[OutgoingMessage]] = [deque(), deque()]
+        self._condition = Condition()
+        self._sending = False
+        self._close = False
+
+    def put(self, recipient: int, text: str, type: int) -> None:
+        with self._condition:
+            self._queues[0 if type == 1 else 1].append((recipient, text, type))
+            self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until everything queued so far has been sent."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._sending and not any(self._queues), timeout
+            )
+
+    def close(self) -> None:
+        with self._condition:
+            self._close = True
+            self._condition.notify_all()
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._close or any(self._queues))
+                if self._close:
+                    return
+                recipient, text, type = self._pop()
+                self._sending = True
+            try:
+                for chunk in split(text):
+                    self._take_token()
+                    self.ttclient.send_text_message(chunk, recipient, type)
+            except Exception as e:
+                logging.error(f"MessageSender: Failed to send a message: {e}")
+            finally:
+                with self._condition:
+                    self._sending = False
+                    self._condition.notify_all()
+
+    def _pop(self) -> OutgoingMessage:
+        queue = next(q for q in self._queues if q)
+        recipient, text, type = queue.popleft()
+        if len(split(text)) > 1:
+            return recipient, text, type
+        # Merge later messages to the same recipient while they fit in one chunk;
+        # messages to others keep their place
+        pending = [m for m in queue if m[0] == recipient and m[2] == type]
+        for message in pending:
+            merged = text + "\n" + message[1]
+            if len(split(merged)) > 1:
+                break
+            text = merged
+            queue.remove(message)
+        return recipient, text, type
+
+    def _take_token(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last_refill) * self.rate
+            )
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            time.sleep((1 - self._tokens) / self.rate)
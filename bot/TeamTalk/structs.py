@@ -1,4 +1,5 @@
 from enum import Enum, Flag
+from typing import Optional
 
 import TeamTalkPy
 
@@ -47,15 +48,40 @@ class ChannelType(Flag):
     SoloTransmit = TeamTalkPy.ChannelType.CHANNEL_SOLO_TRANSMIT
 
 
+class AudioCodec:
+    def __init__(
+        self,
+        codec: int,
+        sample_rate: int,
+        channels: int,
+        bitrate: Optional[int],
+        tx_interval: int,
+    ) -> None:
+        self.codec = codec
+        self.sample_rate = sample_rate
+        self.channels = channels
+        # In bits per second, None for quality based Speex
+        self.bitrate = bitrate
+        # Milliseconds of audio per packet
+        self.tx_interval = tx_interval
+
+
 class Channel:
     def __init__(
-        self, id: int, name: str, topic: str, max_users: int, type: ChannelType
+        self,
+        id: int,
+        name: str,
+        topic: str,
+        max_users: int,
+        type: ChannelType,
+        audio_codec: Optional[AudioCodec] = None,
     ) -> None:
         self.id = id
         self.name = name
         self.topic = topic
         self.max_users = max_users
         self.type = type
+        self.audio_codec = audio_codec
 
 
 class ErrorType(Enum):
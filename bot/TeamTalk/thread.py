@@ -34,16 +34,28 @@ class TeamTalkThread(Thread):
             event = self.ttclient.get_event(self.ttclient.tt.getMessage())
             if event.event_type == EventType.NONE:
                 continue
-            elif (
+            if event.event_type in (
+                EventType.CON_FAILED,
+                EventType.CON_LOST,
+                EventType.MYSELF_KICKED,
+                EventType.MYSELF_LOGGEDIN,
+                EventType.MYSELF_LOGGEDOUT,
+            ) or (
+                event.event_type
+                in (EventType.USER_JOINED, EventType.USER_LEFT, EventType.USER_UPDATE)
+                and event.user.id == self.ttclient.user_id
+            ):
+                self.ttclient.invalidate_self()
+            if (
                 event.event_type == EventType.ERROR
                 and self.ttclient.state == State.CONNECTED
             ):
-                self.ttclient.errors_queue.put(event.error)
+                self.ttclient.event_registry.fail_command(event.error)
             elif (
                 event.event_type == EventType.SUCCESS
                 and self.ttclient.state == State.CONNECTED
             ):
-                self.ttclient.event_success_queue.put(event)
+                self.ttclient.event_registry.complete_command(event)
             elif (
                 event.event_type == EventType.USER_TEXT_MESSAGE
                 and event.message.type == MessageType.User
@@ -54,7 +66,7 @@ class TeamTalkThread(Thread):
                 and event.file.username == self.config.username
                 and event.file.channel.id == self.ttclient.channel.id
             ):
-                self.ttclient.uploaded_files_queue.put(event.file)
+                self.ttclient.event_registry.complete_file(event.file)
             elif (
                 event.event_type == EventType.CON_FAILED
                 or event.event_type == EventType.CON_LOST
@@ -66,6 +78,7 @@ class TeamTalkThread(Thread):
                     logging.warning("Server lost")
                 else:
                     logging.warning("Kicked")
+                self.ttclient.event_registry.fail_all("Connection lost")
                 self.ttclient.disconnect()
                 if (
                     self.ttclient.reconnect
@@ -18,10 +18,12 @@ from bot import (
     config,
     connectors,
     logger,
+    media_cache,
     modules,
     player,
     services,
     sound_devices,
+    stream_proxy,
     translator,
     app_vars,
 )
@@ -68,9 +70,14 @@ class Bot:
             )
         self.cache = self.cache_manager.cache
         self.log_file_name = log_file_name
+        self.media_cache = media_cache.MediaCache(self)
+        self.stream_proxy = stream_proxy.StreamProxy(self)
         self.player = player.Player(self)
         self.ttclient = TeamTalk.TeamTalk(self)
         self.tt_player_connector = connectors.TTPlayerConnector(self)
+        self.audio_bridge = (
+            connectors.AudioBridge(self) if self.player.audio_bridge_file else None
+        )
         self.sound_device_manager = sound_devices.SoundDeviceManager(self)
         self.service_manager = services.ServiceManager(self)
         self.module_manager = modules.ModuleManager(self)
@@ -97,8 +104,12 @@ class Bot:
             signal.signal(signal.SIGTERM, lambda signum, frame: self.close())
         except Exception as e:
             logging.warning(f"Could not register SIGTERM handler: {e}")
+        self.stream_proxy.start()
         self.player.run()
         self.tt_player_connector.start()
+        if self.audio_bridge:
+            self.audio_bridge.start()
+        self.module_manager.file_reaper.start()
         self.command_processor.run()
         logging.info("Started")
         logging.info(f"Processing {len(self.config.general.start_commands)} startup command(s)...")
@@ -188,10 +199,16 @@ class Bot:
             try:
                 msg = self.translator.translate("The bot is restarting now to apply the update. See you in a moment!")
                 self.ttclient.send_message(msg, type=2)
-                time.sleep(0.5)
             except Exception as e:
                 logging.error(f"Error sending shutdown message: {e}")
+        # Let queued replies and notices go out before disconnecting
+        self.ttclient.message_sender.flush(timeout=5)
+        if self.audio_bridge:
+            self.audio_bridge.close()
         self.player.close()
+        self.stream_proxy.close()
+        self.service_manager.close()
+        self.module_manager.file_reaper.close()
         self.ttclient.close()
         self.tt_player_connector.close()
         self.config_manager.close()
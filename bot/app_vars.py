@@ -19,6 +19,8 @@ Original Authors: Amir Gumerov, Vladislav Kopylov, Beqa Gozalishvili, Kirill Bel
 fallback_service = "yt"
 loop_timeout = 0.01
 max_message_length = 256
+# TeamTalk strings are 512 bytes including the terminating null
+max_message_bytes = 511
 recents_max_lenth = 32
 tt_event_timeout = 2
 
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import pickle
+import threading
 from collections import deque
-from typing import Any, Dict, List, TYPE_CHECKING
+from typing import Any, Dict, List, Tuple, TYPE_CHECKING
 
 from bot import app_vars
 from bot.migrators import cache_migrator
@@ -27,17 +28,45 @@ class Cache:
         self.favorites: Dict[str, List[Track]] = (
             cache_data["favorites"] if "favorites" in cache_data else {}
         )
+        self.expiring_files: List[Tuple[float, int, int]] = (
+            cache_data["expiring_files"] if "expiring_files" in cache_data else []
+        )
+        # "service:video ID" -> integrated loudness in LUFS
+        self.loudness: Dict[str, float] = (
+            cache_data["loudness"] if "loudness" in cache_data else {}
+        )
 
     @property
     def data(self):
-        return {"cache_version": self.cache_version, "recents": self.recents, "favorites": self.favorites}
+        return {
+            "cache_version": self.cache_version,
+            "recents": self.recents,
+            "favorites": self.favorites,
+            "expiring_files": self.expiring_files,
+            "loudness": self.loudness,
+        }
+
+    def copy_data(self) -> cache_data_type:
+        """Copies the containers so pickling the result can't race later changes."""
+        return {
+            "cache_version": self.cache_version,
+            "recents": deque(self.recents, maxlen=self.recents.maxlen),
+            "favorites": {
+                username: list(tracks) for username, tracks in self.favorites.items()
+            },
+            "expiring_files": list(self.expiring_files),
+            "loudness": dict(self.loudness),
+        }
 
 
 class CacheManager:
-    version = 1
+    version = 3
 
     def __init__(self, file_name: str) -> None:
         self.file_name = file_name
+        # Held while changing the cache; save() must be called after releasing it
+        self.lock = threading.Lock()
+        self._save_lock = threading.Lock()
         try:
             self.data = cache_migrator.migrate(self, self._load())
             self.cache = Cache(self.data)
@@ -69,6 +98,10 @@ class CacheManager:
         self.file_locker.release()
 
     def save(self):
-        self.file_locker.release()
-        self._dump(self.cache.data)
-        self.file_locker.acquire()
+        # Saves come from the command, player and reaper threads
+        with self._save_lock:
+            with self.lock:
+                data = self.cache.copy_data()
+            self.file_locker.release()
+            self._dump(data)
+            self.file_locker.acquire()
@@ -3,11 +3,13 @@ from __future__ import annotations
 import logging
 import re
 from threading import Thread
-from typing import Any, Dict, List, TYPE_CHECKING, Tuple
+from typing import Any, Dict, List, Set, TYPE_CHECKING, Tuple, Type
 
 from bot import app_vars, errors
+from bot.TeamTalk import split
 from bot.TeamTalk.structs import Message, User, UserType
 from bot.commands import admin_commands, user_commands
+from bot.commands.command import Command
 from bot.commands.task_processor import TaskProcessor
 
 re_command = re.compile("[a-z]+")
@@ -17,7 +19,22 @@ if TYPE_CHECKING:
     from bot import Bot
 
 
+class CommandSpec:
+    __slots__ = ("name", "command_class", "admin_only", "requires_channel", "requires_arg")
+
+    def __init__(self, name: str, command_class: Type[Command], admin_only: bool) -> None:
+        self.name = name
+        self.command_class = command_class
+        self.admin_only = admin_only
+        # jc is how users outside the bot's channel bring it to them
+        self.requires_channel = name != "jc"
+        self.requires_arg = command_class.requires_arg
+
+
 class CommandProcessor:
+    # Messages per help page
+    help_page_size = 4
+
     def __init__(self, bot: Bot):
         self.task_processor = TaskProcessor(self)
         self.bot = bot
@@ -39,6 +56,8 @@ class CommandProcessor:
         # Volatile search results state (reset on restart)
         self.search_results_count: int = 1
         self.pending_search_results: Dict[int, List] = {}
+        # (locale, is_admin) -> pages of the full help
+        self._help_pages: Dict[Tuple[str, bool], List[str]] = {}
         self.commands_dict = {
             "h": user_commands.HelpCommand,
             "a": user_commands.AboutCommand,
@@ -96,10 +115,22 @@ class CommandProcessor:
             "eh": admin_commands.EventHandlingCommand,
             "sc": admin_commands.SaveConfigCommand,
             "va": admin_commands.VoiceTransmissionCommand,
+            "ps": admin_commands.PlaybackStatsCommand,
             "rs": admin_commands.RestartCommand,
             "q": admin_commands.QuitCommand,
             "gcid": admin_commands.GetChannelIDCommand,
         }
+        self.command_specs: Dict[str, CommandSpec] = {
+            name: CommandSpec(name, command_class, True)
+            for name, command_class in self.admin_commands_dict.items()
+        }
+        self.command_specs.update(
+            {
+                name: CommandSpec(name, command_class, False)
+                for name, command_class in self.commands_dict.items()
+            }
+        )
+        self.blocked_commands: Set[str] = set(self.config.general.blocked_commands)
 
     def run(self):
         self.task_processor.start()
@@ -123,8 +154,10 @@ class CommandProcessor:
             
             logging.info(f"Executing command '{command_name}' with args '{arg}' from user {message.user.username}")
             if self.check_access(message.user, command_name):
-                command_class = self.get_command(command_name, message.user)
-                command = command_class(self)
+                spec = self.get_command_spec(command_name, message.user)
+                if spec.requires_arg and not arg:
+                    raise errors.InvalidArgumentError()
+                command = spec.command_class(self)
                 self.current_command_id = id(command)
                 result = command(arg, message.user)
                 if result:
@@ -152,67 +185,107 @@ class CommandProcessor:
             )
 
     def check_access(self, user: User, command: str) -> bool:
-        if (
-            not user.is_admin and user.type != UserType.Admin
-        ) or app_vars.app_name in user.client_name:
-            if app_vars.app_name in user.client_name:
-                raise errors.AccessDeniedError("")
-            elif user.is_banned:
-                raise errors.AccessDeniedError(
-                    self.translator.translate("You are banned"),
-                )
-            elif user.channel.id != self.ttclient.channel.id and command != "jc":
-                raise errors.AccessDeniedError(
-                    self.translator.translate("You are not in bot's channel"),
-                )
-            elif self.locked:
-                raise errors.AccessDeniedError(
-                    self.translator.translate("Bot is locked"),
-                )
-            elif command in self.config.general.blocked_commands:
-                raise errors.AccessDeniedError(
-                    self.translator.translate("This command is blocked"),
-                )
-            else:
-                return True
-        else:
+        if app_vars.app_name in user.client_name:
+            raise errors.AccessDeniedError("")
+        elif self.is_admin(user):
             return True
+        elif user.is_banned:
+            raise errors.AccessDeniedError(
+                self.translator.translate("You are banned"),
+            )
+        spec = self.command_specs.get(command)
+        if (
+            (spec is None or spec.requires_channel)
+            and user.channel.id != self.ttclient.channel_id
+        ):
+            raise errors.AccessDeniedError(
+                self.translator.translate("You are not in bot's channel"),
+            )
+        elif self.locked:
+            raise errors.AccessDeniedError(
+                self.translator.translate("Bot is locked"),
+            )
+        elif command in self.blocked_commands:
+            raise errors.AccessDeniedError(
+                self.translator.translate("This command is blocked"),
+            )
+        return True
 
-    def get_command(self, command: str, user: User) -> Any:
-        if command in self.commands_dict:
-            return self.commands_dict[command]
-        elif (
-            user.is_admin or user.type == UserType.Admin
-        ) and command in self.admin_commands_dict:
-            return self.admin_commands_dict[command]
-        else:
+    def is_admin(self, user: User) -> bool:
+        return user.is_admin or user.type == UserType.Admin
+
+    def get_command_spec(self, command: str, user: User) -> CommandSpec:
+        spec = self.command_specs.get(command)
+        if spec is None or spec.admin_only and not self.is_admin(user):
             raise errors.UnknownCommandError()
+        return spec
+
+    def get_command(self, command: str, user: User) -> Any:
+        return self.get_command_spec(command, user).command_class
+
+    def update_blocked_commands(self) -> None:
+        self.blocked_commands = set(self.config.general.blocked_commands)
+        self.invalidate_help()
 
     def help(self, arg: str, user: User) -> str:
-        if arg:
+        arg = arg.strip()
+        if arg and not arg.isdigit():
             if arg in self.commands_dict:
                 return "{} {}".format(arg, self.commands_dict[arg](self).help)
             elif user.is_admin and arg in self.admin_commands_dict:
                 return "{} {}".format(arg, self.admin_commands_dict[arg](self).help)
             else:
                 return self.translator.translate("Unknown command")
+        pages = self._get_help_pages(user.is_admin)
+        page = int(arg) if arg else 1
+        if not 1 <= page <= len(pages):
+            return self.translator.translate(
+                "Incorrect page number. Pages: {count}"
+            ).format(count=len(pages))
+        if len(pages) == 1:
+            return pages[0]
+        elif page < len(pages):
+            footer = self.translator.translate(
+                'Page {page} of {count}. Send "h {next}" for the next page'
+            ).format(page=page, count=len(pages), next=page + 1)
         else:
-            help_strings: List[str] = []
-            for i in list(self.commands_dict):
-                help_strings.append(self.help(i, user))
-            if user.is_admin:
-                for i in list(self.admin_commands_dict):
-                    help_strings.append(self.help(i, user))
-            return "\n".join(help_strings)
+            footer = self.translator.translate("Page {page} of {count}").format(
+                page=page, count=len(pages)
+            )
+        return pages[page - 1] + "\n" + footer
+
+    def invalidate_help(self) -> None:
+        self._help_pages.clear()
+
+    def _get_help_pages(self, is_admin: bool) -> List[str]:
+        key = (self.translator.get_locale(), is_admin)
+        pages = self._help_pages.get(key)
+        if pages is None:
+            help_strings: List[str] = [
+                "{} {}".format(name, command(self).help)
+                for name, command in self.commands_dict.items()
+                if is_admin or name not in self.blocked_commands
+            ]
+            if is_admin:
+                help_strings += [
+                    "{} {}".format(name, command(self).help)
+                    for name, command in self.admin_commands_dict.items()
+                ]
+            # Pages are made of whole messages, so sending one splits it the same way
+            chunks = split("\n".join(help_strings))
+            pages = [
+                "\n".join(chunks[i : i + self.help_page_size])
+                for i in range(0, len(chunks), self.help_page_size)
+            ]
+            self._help_pages[key] = pages
+        return pages
 
     def parse_command(self, text: str) -> Tuple[str, str]:
-        text = text.strip()
-        try:
-            command = re.findall(re_command, text.split(" ")[0].lower())[0]
-        except IndexError:
+        command, _, arg = text.strip().partition(" ")
+        match = re_command.search(command.lower())
+        if not match:
             raise errors.ParseCommandError()
-        arg = " ".join(text.split(" ")[1::])
-        return command, arg
+        return match.group(), arg
 
     def split_arg(self, arg: str) -> List[str]:
         args = re.split(re_arg_split, arg)
@@ -2,13 +2,11 @@ from __future__ import annotations
 import os
 import subprocess
 import sys
-import time
 from typing import Optional, TYPE_CHECKING
-from queue import Empty
 
 from bot.commands.command import Command
 from bot.player.enums import State
-from bot import app_vars, errors
+from bot import errors
 
 if TYPE_CHECKING:
     from bot.TeamTalk.structs import User
@@ -34,6 +32,7 @@ class BlockCommandCommand(Command):
         if arg[0] == "+":
             if arg[1::] not in self.config.general.blocked_commands:
                 self.config.general.blocked_commands.append(arg[1::])
+                self.command_processor.update_blocked_commands()
                 return self.translator.translate("Added")
             else:
                 return self.translator.translate("This command is already added")
@@ -42,6 +41,7 @@ class BlockCommandCommand(Command):
                 del self.config.general.blocked_commands[
                     self.config.general.blocked_commands.index(arg[1::])
                 ]
+                self.command_processor.update_blocked_commands()
                 return self.translator.translate("Deleted")
             else:
                 return self.translator.translate("This command is not blocked")
@@ -74,6 +74,7 @@ class ChangeLanguageCommand(Command):
             try:
                 self.translator.set_locale(arg)
                 self.config.general.language = arg
+                self.command_processor.invalidate_help()
                 self.ttclient.change_status_text("")
                 return self.translator.translate("The language has been changed")
             except errors.LocaleNotFoundError:
@@ -106,16 +107,19 @@ class ClearCacheCommand(Command):
 
     def __call__(self, arg: str, user: User) -> Optional[str]:
         if not arg:
-            self.cache.recents.clear()
-            self.cache.favorites.clear()
+            with self.cache_manager.lock:
+                self.cache.recents.clear()
+                self.cache.favorites.clear()
             self.cache_manager.save()
             return self.translator.translate("Cache cleared")
         elif arg == "r":
-            self.cache.recents.clear()
+            with self.cache_manager.lock:
+                self.cache.recents.clear()
             self.cache_manager.save()
             return self.translator.translate("Recents cleared")
         elif arg == "f":
-            self.cache.favorites.clear()
+            with self.cache_manager.lock:
+                self.cache.favorites.clear()
             self.cache_manager.save()
             return self.translator.translate("Favorites cleared")
 
@@ -141,29 +145,15 @@ class JoinChannelCommand(Command):
         if isinstance(channel, str) and channel.isdigit():
             channel = int(channel)
         try:
-            cmd = self.ttclient.join_channel(channel, password)
+            self.ttclient.run_command(
+                lambda: self.ttclient.join_channel(channel, password)
+            )
         except ValueError:
             return self.translator.translate("This channel does not exist")
-        while True:
-            try:
-                event = self.ttclient.event_success_queue.get_nowait()
-                if event.source == cmd:
-                    break
-                else:
-                    self.ttclient.event_success_queue.put(event)
-            except Empty:
-                pass
-            try:
-                error = self.ttclient.errors_queue.get_nowait()
-                if error.command_id == cmd:
-                    return self.translator.translate(
-                        "Error joining channel: {error}".format(error=error.message)
-                    )
-                else:
-                    self.ttclient.errors_queue.put(error)
-            except Empty:
-                pass
-            time.sleep(app_vars.loop_timeout)
+        except errors.TTEventError as e:
+            return self.translator.translate(
+                "Error joining channel: {error}".format(error=e)
+            )
 
 
 """ class TaskSchedulerCommand(Command):
@@ -222,6 +212,41 @@ class VoiceTransmissionCommand(Command):
             return self.translator.translate("Voice transmission disabled")
 
 
+class PlaybackStatsCommand(Command):
+    @property
+    def help(self) -> str:
+        return self.translator.translate(
+            "Shows how often playback stalled for buffering, by track type"
+        )
+
+    def __call__(self, arg: str, user: User) -> Optional[str]:
+        lines = []
+        for type, stats in self.player.buffering.stats.items():
+            if not stats.tracks:
+                continue
+            lines.append(
+                self.translator.translate(
+                    "{type}: {stalled_tracks} of {tracks} tracks stalled, {stalls} stalls, {stall_time:.1f}s in total"
+                ).format(
+                    type=type.name,
+                    stalled_tracks=stats.stalled_tracks,
+                    tracks=stats.tracks,
+                    stalls=stats.stalls,
+                    stall_time=stats.stall_time,
+                )
+            )
+        first_audio = self.player.get_first_audio_p50()
+        if first_audio is not None:
+            lines.append(
+                self.translator.translate(
+                    "Time to first audio: {time:.2f}s median over the last {count} tracks"
+                ).format(time=first_audio, count=len(self.player.first_audio_times))
+            )
+        if not lines:
+            return self.translator.translate("No tracks have been played yet")
+        return "\n".join(lines)
+
+
 class LockCommand(Command):
     @property
     def help(self) -> str:
@@ -9,6 +9,10 @@ if TYPE_CHECKING:
 
 
 class Command:
+    # Commands that can't do anything without an argument; the processor answers
+    # them with the help text without creating the command
+    requires_arg = False
+
     def __init__(self, command_processor: CommandProcessor):
         self._bot = command_processor.bot
         self.cache = command_processor.cache
@@ -1,11 +1,12 @@
 from __future__ import annotations
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import logging
 import os
-import tempfile
-import zipfile
+import time
 from typing import List, Optional, TYPE_CHECKING
 
 from bot.commands.command import Command
+from bot.modules.batch_downloader import BatchMode
 from bot.player.enums import Mode, State, TrackType
 from bot.TeamTalk.structs import User, UserRight
 from bot import errors, app_vars, utils
@@ -17,7 +18,9 @@ if TYPE_CHECKING:
 class HelpCommand(Command):
     @property
     def help(self) -> str:
-        return self.translator.translate("Shows command help")
+        return self.translator.translate(
+            "COMMAND/PAGE Shows command help. With a command shows its help, with a number shows that page of the full help"
+        )
 
     def __call__(self, arg: str, user: User) -> Optional[str]:
         return self.command_processor.help(arg, user)
@@ -41,6 +44,7 @@ class PlayPauseCommand(Command):
 
     def __call__(self, arg: str, user: User) -> Optional[str]:
         if arg:
+            requested_at = time.perf_counter()
             self.run_async(
                 self.ttclient.send_message,
                 self.translator.translate("Searching..."),
@@ -50,7 +54,7 @@ class PlayPauseCommand(Command):
                 # Search results mode: request more results from the service directly
                 if self.config.general.search_results_mode:
                     count = self.command_processor.search_results_count
-                    track_list = self.service_manager.service.search(arg, limit=count)
+                    track_list = self.service_manager.search(arg, limit=count)
                     self.command_processor.pending_search_results[user.id] = track_list
                     lines = [self.translator.translate("Search results:")]
                     for i, track in enumerate(track_list):
@@ -59,7 +63,10 @@ class PlayPauseCommand(Command):
                     return "\n".join(lines)
 
                 # Normal mode: request only 1 result and play immediately
-                track_list = self.service_manager.service.search(arg)
+                track_list = self.service_manager.search(arg)
+                name = track_list[0].name
+                # Start resolving the stream while the messages are being sent
+                self.player.prefetch(track_list[0])
                 if self.config.general.send_channel_messages:
                     self.run_async(
                         self.ttclient.send_message,
@@ -68,10 +75,8 @@ class PlayPauseCommand(Command):
                         ).format(nickname=user.nickname, request=arg),
                         type=2,
                     )
-                self.run_async(self.player.play, track_list)
-                return self.translator.translate("Playing {}").format(
-                    track_list[0].name
-                )
+                self.run_async(self.player.play, track_list, requested_at=requested_at)
+                return self.translator.translate("Playing {}").format(name)
             except errors.NothingFoundError:
                 return self.translator.translate("Nothing is found for your query")
             except errors.ServiceError:
@@ -336,6 +341,13 @@ class ServiceCommand(Command):
                         service.name, service.warning_message
                     )
                 )
+            elif service.name in self.service_manager.latencies:
+                services.append(
+                    "{} ({:.0f} ms)".format(
+                        service.name,
+                        self.service_manager.latencies[service.name] * 1000,
+                    )
+                )
             else:
                 services.append(service.name)
         help = self.translator.translate(
@@ -426,10 +438,11 @@ class FavoritesCommand(Command):
 
     def _add(self, user: User) -> str:
         if self.player.state != State.Stopped:
-            if user.username in self.cache.favorites:
-                self.cache.favorites[user.username].append(self.player.track.get_raw())
-            else:
-                self.cache.favorites[user.username] = [self.player.track.get_raw()]
+            with self.cache_manager.lock:
+                if user.username in self.cache.favorites:
+                    self.cache.favorites[user.username].append(self.player.track.get_raw())
+                else:
+                    self.cache.favorites[user.username] = [self.player.track.get_raw()]
             self.cache_manager.save()
             return self.translator.translate("Added")
         else:
@@ -438,10 +451,11 @@ class FavoritesCommand(Command):
     def _del(self, arg: str, user: User) -> str:
         if (self.player.state != State.Stopped and len(arg) == 1) or len(arg) > 1:
             try:
-                if len(arg) == 1:
-                    self.cache.favorites[user.username].remove(self.player.track)
-                else:
-                    del self.cache.favorites[user.username][int(arg[1::]) - 1]
+                with self.cache_manager.lock:
+                    if len(arg) == 1:
+                        self.cache.favorites[user.username].remove(self.player.track)
+                    else:
+                        del self.cache.favorites[user.username][int(arg[1::]) - 1]
                 self.cache_manager.save()
                 return self.translator.translate("Deleted")
             except IndexError:
@@ -544,16 +558,21 @@ class DownloadCommand(Command):
     @property
     def help(self) -> str:
         return self.translator.translate(
-            "Downloads the current track and uploads it to the channel."
+            "FORMAT Downloads the current track and uploads it to the channel. FORMAT is mp3, m4a, opus or native (keeps the original audio without re-encoding). Without a format the configured one is used"
         )
 
     def __call__(self, arg: str, user: User) -> Optional[str]:
+        audio_format = arg.strip().lower() or None
+        if audio_format and audio_format not in self.service_manager.service.audio_formats:
+            raise errors.InvalidArgumentError()
         if self.player.state != State.Stopped:
             track = self.player.track
             if track.url and (
                 track.type == TrackType.Default or track.type == TrackType.Local
             ):
-                self.module_manager.uploader(self.player.track, user)
+                self.module_manager.uploader(
+                    self.player.track, user, audio_format=audio_format
+                )
                 return self.translator.translate("Downloading...")
             else:
                 return self.translator.translate("Live streams cannot be downloaded")
@@ -594,33 +613,16 @@ class JoinChannelCommand(Command):
         user_channel = user.channel
 
         try:
-            cmd = self.ttclient.move_user(self.ttclient.user.id, user_channel.id)
-
-            import time
-            from bot import app_vars
-            from queue import Empty
-
-            start_time = time.time()
-            while time.time() - start_time < 5:
-                try:
-                    event = self.ttclient.event_success_queue.get_nowait()
-                    if event.source == cmd:
-                        self._bot.jc_requested_by_user_id = user.id
-                        return self.translator.translate("Joining channel: {}").format(user_channel.name)
-                    else:
-                        self.ttclient.event_success_queue.put(event)
-                except Empty:
-                    pass
-
-                try:
-                    error = self.ttclient.errors_queue.get_nowait()
-                    if error.command_id == cmd:
-                        return self.translator.translate("Failed to join channel. Error: {}").format(error.message)
-                    else:
-                        self.ttclient.errors_queue.put(error)
-                except Empty:
-                    pass
-                time.sleep(app_vars.loop_timeout)
+            with self.ttclient.event_registry.registering():
+                cmd = self.ttclient.move_user(self.ttclient.user.id, user_channel.id)
+                future = self.ttclient.event_registry.expect_command(cmd)
+            try:
+                future.result(timeout=5)
+            except FutureTimeoutError:
+                # No answer yet, assume the move is still in progress
+                future.cancel()
+            except errors.TTEventError as e:
+                return self.translator.translate("Failed to join channel. Error: {}").format(e)
 
             self._bot.jc_requested_by_user_id = user.id
             return self.translator.translate("Joining channel: {}").format(user_channel.name)
@@ -736,6 +738,8 @@ class DownloadPlaylistCommand(Command):
 # ===========================================================================
 
 class QueueAddCommand(Command):
+    requires_arg = True
+
     @property
     def help(self) -> str:
         return self.translator.translate(
@@ -753,7 +757,7 @@ class QueueAddCommand(Command):
         )
 
         try:
-            track_list = self.service_manager.service.search(arg)
+            track_list = self.service_manager.search(arg)
         except errors.NothingFoundError:
             return self.translator.translate("Nothing is found for your query")
         except errors.ServiceError:
@@ -765,8 +769,10 @@ class QueueAddCommand(Command):
 
         # Se nada está tocando, inicia imediatamente
         if self.player.state == State.Stopped:
+            name = track.name
+            self.player.prefetch(track)
             self.run_async(self.player.play, [track])
-            return self.translator.translate("Playing {}").format(track.name)
+            return self.translator.translate("Playing {}").format(name)
 
         # Caso contrário, enfileira
         position = self.player.queue.add(track)
@@ -809,6 +815,8 @@ class QueueListCommand(Command):
 
 
 class QueueRemoveCommand(Command):
+    requires_arg = True
+
     @property
     def help(self) -> str:
         return self.translator.translate(
@@ -953,18 +961,20 @@ class SelectSearchResultCommand(Command):
         track = results[number - 1]
         # Clear pending results after selection
         del self.command_processor.pending_search_results[user.id]
+        name = track.name
+        self.player.prefetch(track)
 
         if self.config.general.send_channel_messages:
             self.run_async(
                 self.ttclient.send_message,
                 self.translator.translate(
                     "{nickname} selected: {track}"
-                ).format(nickname=user.nickname, track=track.name),
+                ).format(nickname=user.nickname, track=name),
                 type=2,
             )
 
         self.run_async(self.player.play, [track])
-        return self.translator.translate("Playing {}").format(track.name)
+        return self.translator.translate("Playing {}").format(name)
 
 
 class SearchResultsCountCommand(Command):
@@ -1001,6 +1011,8 @@ class SearchResultsCountCommand(Command):
 
 
 class AddLinkCommand(Command):
+    requires_arg = True
+
     @property
     def help(self) -> str:
         return self.translator.translate(
@@ -1022,6 +1034,8 @@ class AddLinkCommand(Command):
 
 
 class AddMultipleLinksCommand(Command):
+    requires_arg = True
+
     @property
     def help(self) -> str:
         return self.translator.translate(
@@ -1066,6 +1080,8 @@ class ListLinksCommand(Command):
 
 
 class RemoveLinkCommand(Command):
+    requires_arg = True
+
     @property
     def help(self) -> str:
         return self.translator.translate(
@@ -1100,6 +1116,8 @@ class RemoveLinkCommand(Command):
 
 
 class DownloadDirectCommand(Command):
+    requires_arg = True
+
     @property
     def help(self) -> str:
         return self.translator.translate(
@@ -1155,224 +1173,26 @@ class DownloadListCommand(Command):
             )
 
         if arg == "1":
-            links_copy = list(links)
-            self.command_processor.download_links[user.id] = []
-            if self.command_processor.adsc_enabled:
-                self.run_async(self._process_normal_local, links_copy, user)
-                return self.translator.translate("Starting local download of {count} links...").format(count=len(links_copy))
-            else:
-                self.run_async(self._process_normal, links_copy, user)
-                return self.translator.translate("Starting download of {count} links...").format(count=len(links_copy))
+            mode = BatchMode.Local if self.command_processor.adsc_enabled else BatchMode.Upload
         elif arg == "2":
-            links_copy = list(links)
-            self.command_processor.download_links[user.id] = []
-            if self.command_processor.adsc_enabled:
-                self.run_async(self._process_zip_local, links_copy, user)
-                return self.translator.translate("Resolving and zipping locally {count} links...").format(count=len(links_copy))
-            else:
-                self.run_async(self._process_zip, links_copy, user)
-                return self.translator.translate("Resolving and zipping {count} links...").format(count=len(links_copy))
+            mode = BatchMode.LocalZip if self.command_processor.adsc_enabled else BatchMode.Zip
         else:
             return self.translator.translate("Invalid option. Please send 'ads' again to select.")
 
-    def _process_normal(self, links: List[str], user: User) -> None:
-        for i, link in enumerate(links):
-            try:
-                self.ttclient.send_message(
-                    self.translator.translate("Processing link {number}/{total}: {link}").format(
-                        number=i + 1, total=len(links), link=link
-                    ),
-                    user
-                )
-                tracks = self.module_manager.streamer.get(link, user.is_admin)
-                if not tracks:
-                    self.ttclient.send_message(
-                        self.translator.translate("Nothing is found for: {link}").format(link=link),
-                        user
-                    )
-                    continue
-
-                for track in tracks:
-                    self.module_manager.uploader.run(track, user)
-            except Exception as e:
-                self.ttclient.send_message(
-                    self.translator.translate("Error downloading {link}: {error}").format(
-                        link=link, error=str(e)
-                    ),
-                    user
-                )
-
-    def _process_normal_local(self, links: List[str], user: User) -> None:
-        error_count = 0
-        dest_dir = "/home/ttbot/TTMediaBot/data/Downloads/music"
-        try:
-            os.makedirs(dest_dir, exist_ok=True)
-        except Exception as e:
-            logging.error(f"Failed to create directory {dest_dir}: {e}")
-            self.ttclient.send_message(
-                self.translator.translate("Error: {}").format(str(e)),
-                user
-            )
-            return
-
-        for i, link in enumerate(links):
-            try:
-                self.ttclient.send_message(
-                    self.translator.translate("Processing link {number}/{total}: {link}").format(
-                        number=i + 1, total=len(links), link=link
-                    ),
-                    user
-                )
-                tracks = self.module_manager.streamer.get(link, user.is_admin)
-                if not tracks:
-                    self.ttclient.send_message(
-                        self.translator.translate("Nothing is found for: {link}").format(link=link),
-                        user
-                    )
-                    error_count += 1
-                    continue
-
-                for track in tracks:
-                    try:
-                        if track.type == TrackType.Dynamic:
-                            track.url
-                        track.download(dest_dir)
-                    except Exception as download_err:
-                        logging.error(f"Local download failed for track {track.name}: {download_err}")
-                        error_count += 1
-            except Exception as e:
-                logging.error(f"Error processing link {link}: {e}")
-                error_count += 1
-
-        if error_count == 0:
-            self.ttclient.send_message(
-                self.translator.translate("All downloads completed successfully!"),
-                user
-            )
-        else:
-            self.ttclient.send_message(
-                self.translator.translate("Downloads completed with {error_count} error(s).").format(
-                    error_count=error_count
-                ),
-                user
-            )
-
-    def _process_zip(self, links: List[str], user: User) -> None:
-        try:
-            self.ttclient.send_message(
-                self.translator.translate("Resolving links..."),
-                user
-            )
-            tracks = []
-            for link in links:
-                try:
-                    resolved = self.module_manager.streamer.get(link, user.is_admin)
-                    if resolved:
-                        tracks.extend(resolved)
-                except Exception as e:
-                    logging.error(f"ADS ZIP: Failed to resolve {link}: {e}")
-
-            if not tracks:
-                self.ttclient.send_message(
-                    self.translator.translate("Error: No valid tracks found to download."),
-                    user
-                )
-                return
-
-            self.module_manager.playlist_uploader(tracks, user, "Compressed Links")
-        except Exception as e:
-            self.ttclient.send_message(
-                self.translator.translate("Error: {}").format(str(e)),
-                user
-            )
-
-    def _process_zip_local(self, links: List[str], user: User) -> None:
-        error_count = 0
-        try:
-            self.ttclient.send_message(
-                self.translator.translate("Resolving links..."),
-                user
-            )
-            tracks = []
-            for link in links:
-                try:
-                    resolved = self.module_manager.streamer.get(link, user.is_admin)
-                    if resolved:
-                        tracks.extend(resolved)
-                    else:
-                        error_count += 1
-                except Exception as e:
-                    logging.error(f"ADSC ZIP: Failed to resolve {link}: {e}")
-                    error_count += 1
-
-            if not tracks:
-                self.ttclient.send_message(
-                    self.translator.translate("Error: No valid tracks found to download."),
-                    user
-                )
-                return
-
-            temp_dir = tempfile.TemporaryDirectory()
-            downloaded_files = []
-
-            for i, track in enumerate(tracks):
-                try:
-                    if track.type == TrackType.Dynamic:
-                        track.url
-                    file_path = track.download(temp_dir.name)
-                    downloaded_files.append(file_path)
-                except Exception as e:
-                    logging.error(f"ADSC ZIP: Failed to download track {track.name}: {e}")
-                    error_count += 1
-
-            if not downloaded_files:
-                self.ttclient.send_message(
-                    self.translator.translate("Error: Failed to download any tracks from this playlist."),
-                    user
-                )
-                temp_dir.cleanup()
-                return
-
-            dest_dir = "/home/ttbot/TTMediaBot/data/Downloads/zips"
-            os.makedirs(dest_dir, exist_ok=True)
-
-            folder_name = "Compressed_Links"
-            zip_filename = folder_name + ".zip"
-            zip_path = os.path.join(dest_dir, zip_filename)
-
-            counter = 1
-            while os.path.exists(zip_path):
-                zip_filename = f"{folder_name}_{counter}.zip"
-                zip_path = os.path.join(dest_dir, zip_filename)
-                counter += 1
-
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file in downloaded_files:
-                    arcname = os.path.join(folder_name, os.path.basename(file))
-                    zipf.write(file, arcname)
-
-            temp_dir.cleanup()
-
-        except Exception as e:
-            logging.error(f"ADSC ZIP processing error: {e}", exc_info=True)
-            self.ttclient.send_message(
-                self.translator.translate("Error: {}").format(str(e)),
-                user
-            )
-            return
-
-        if error_count == 0:
-            self.ttclient.send_message(
-                self.translator.translate("All downloads completed successfully!"),
-                user
+        links_copy = list(links)
+        if not self.module_manager.batch_downloader(links_copy, user, mode):
+            return self.translator.translate(
+                "You already have a batch download running. Please wait until it finishes."
             )
+        self.command_processor.download_links[user.id] = []
+        if mode == BatchMode.Local:
+            return self.translator.translate("Starting local download of {count} links...").format(count=len(links_copy))
+        elif mode == BatchMode.Upload:
+            return self.translator.translate("Starting download of {count} links...").format(count=len(links_copy))
+        elif mode == BatchMode.LocalZip:
+            return self.translator.translate("Resolving and zipping locally {count} links...").format(count=len(links_copy))
         else:
-            self.ttclient.send_message(
-                self.translator.translate("Downloads completed with {error_count} error(s).").format(
-                    error_count=error_count
-                ),
-                user
-            )
+            return self.translator.translate("Resolving and zipping {count} links...").format(count=len(links_copy))
 
 
 class ToggleLocalDownloadCommand(Command):
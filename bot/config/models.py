@@ -24,6 +24,15 @@ class PlayerModel(BaseModel):
     volume_fading: bool = True
     volume_fading_interval: float = 0.025
     seek_step: int = 5
+    # Feed decoded audio straight into TeamTalk instead of through a sound
+    # device loopback, POSIX only
+    audio_bridge: bool = False
+    # Play service streams through a local caching proxy that survives URL expiry
+    stream_proxy: bool = False
+    stream_cache_size: int = 256
+    # Apply a static per-track gain from measured loudness, in LUFS
+    normalize_loudness: bool = False
+    target_loudness: float = -16.0
     player_options: Dict[str, Any] = {}
 
 class TeamTalkUserModel(BaseModel):
@@ -52,6 +61,8 @@ class TeamTalkModel(BaseModel):
     license_key: str = ""
     reconnection_attempts: int = -1
     reconnection_timeout: int = 10
+    messages_per_second: float = 5.0
+    message_burst: int = 10
     users: TeamTalkUserModel = TeamTalkUserModel()
     event_handling: EventHandlingModel = EventHandlingModel()
 
@@ -62,6 +73,10 @@ class YtModel(BaseModel):
     enabled: bool = True
     cookiefile_path: str = ""
     search_results: int = 1
+    # Seconds a resolve may take in total, attempts still running are dropped
+    resolve_deadline: int = 30
+    # Race a second attempt when the first is slower than usual
+    hedge_requests: bool = True
 
 
 
@@ -73,10 +88,41 @@ class YtmModel(BaseModel):
 
 class ServicesModel(BaseModel):
     default_service: str = "yt"
+    race_search: bool = False
+    match_channel_bitrate: bool = True
+    # Shared by every request to YouTube, 0 disables the limit
+    requests_per_second: float = 0.0
+    request_burst: int = 10
+    # Rejections in a row that stop all requests for breaker_timeout seconds
+    breaker_threshold: int = 5
+    breaker_timeout: int = 60
+    # Worker processes for extraction and search, 0 runs them in the bot process.
+    # Four leave room for a resolve and its hedge next to searches
+    resolver_processes: int = 4
+    # Started with the bot, the others only once they are needed
+    resolver_warm_processes: int = 1
     yt: YtModel = YtModel()
     ytm: YtmModel = YtmModel()
 
 
+class DownloadsModel(BaseModel):
+    workers: int = 0
+    # Seconds a single download may take, including the wait for a worker process
+    timeout: int = 1800
+    zip_max_size: int = 0
+    audio_format: str = "mp3"
+    cache_directory: str = "media_cache"
+    cache_size: int = 1024
+    local_directory: str = "Downloads"
+    play_from_cache: bool = False
+    # Keep complete streams played through the stream proxy as native downloads
+    capture_streams: bool = False
+    resolve_workers: int = 4
+    transfer_workers: int = 2
+    max_jobs_per_user: int = 1
+    progress_interval: int = 10
+
+
 class LoggerModel(BaseModel):
     log: bool = True
     level: str = "INFO"
@@ -100,5 +146,6 @@ class ConfigModel(BaseModel):
     player: PlayerModel = PlayerModel()
     teamtalk: TeamTalkModel = TeamTalkModel()
     services: ServicesModel = ServicesModel()
+    downloads: DownloadsModel = DownloadsModel()
     logger: LoggerModel = LoggerModel()
     shortening: ShorteningModel = ShorteningModel()
@@ -1 +1,2 @@
+from .audio_bridge import AudioBridge
 from .tt_player_connector import TTPlayerConnector
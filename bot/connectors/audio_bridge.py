@@ -0,0 +1,102 @@
+from __future__ import annotations
+import logging
+from threading import Thread
+import time
+from typing import BinaryIO, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bot import Bot
+
+
+class AudioBridge(Thread):
+    """Moves mpv's decoded audio into TeamTalk as AudioBlocks.
+
+    mpv writes raw 16 bit PCM into a FIFO as fast as the reader takes it, so
+    this thread sets the pace: one block per codec transmit interval, kept a
+    little ahead of real time. The output format follows the channel's codec so
+    TeamTalk doesn't have to resample.
+    """
+
+    # How far ahead of real time audio may be queued, in seconds
+    lead = 0.1
+    # How often the channel codec is checked for changes, in seconds
+    codec_check_interval = 5.0
+
+    def __init__(self, bot: Bot):
+        super().__init__(daemon=True)
+        self.name = "AudioBridgeThread"
+        self.player = bot.player
+        self.ttclient = bot.ttclient
+        self.file_name = self.player.audio_bridge_file
+        self._codec_format: Optional[Tuple[int, int]] = None
+        self._tx_interval = 40
+        self._last_codec_check = 0.0
+        self._close = False
+
+    def run(self) -> None:
+        while not self._close:
+            self._update_format()
+            try:
+                # Blocks until mpv opens the output, which it does on every
+                # audio output reinitialization
+                with open(self.file_name, "rb", buffering=0) as file:
+                    self._transmit(file)
+            except Exception:
+                logging.error("AudioBridge: ", exc_info=True)
+                time.sleep(1)
+
+    def close(self) -> None:
+        self._close = True
+
+    def _transmit(self, file: BinaryIO) -> None:
+        sample_rate, channels = self.player.get_audio_output_format() or (48000, 2)
+        samples = sample_rate * self._tx_interval // 1000
+        block_size = samples * channels * 2
+        block_duration = samples / sample_rate
+        sample_index = 0
+        clock = time.monotonic()
+        while not self._close:
+            data = self._read(file, block_size)
+            data = data[: len(data) - len(data) % (2 * channels)]
+            if not data:
+                # mpv closed the output, e.g. for a format change
+                return
+            self.ttclient.insert_audio_block(data, sample_rate, channels, sample_index)
+            sample_index += len(data) // (2 * channels)
+            clock += block_duration
+            now = time.monotonic()
+            if clock - now > self.lead:
+                time.sleep(clock - now - self.lead)
+            elif now - clock > 1:
+                # Paused or stalled, don't try to catch up
+                clock = now
+            if now - self._last_codec_check >= self.codec_check_interval:
+                self._last_codec_check = now
+                self._update_format()
+
+    def _read(self, file: BinaryIO, size: int) -> bytes:
+        chunks = []
+        while size > 0:
+            chunk = file.read(size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def _update_format(self) -> None:
+        try:
+            audio_codec = self.ttclient.channel.audio_codec
+        except Exception:
+            return
+        if not audio_codec:
+            return
+        if audio_codec.tx_interval > 0:
+            self._tx_interval = audio_codec.tx_interval
+        codec_format = (audio_codec.sample_rate, min(audio_codec.channels, 2))
+        if codec_format != self._codec_format:
+            logging.debug(
+                f"AudioBridge: Switching to {codec_format[0]} Hz, {codec_format[1]} channel(s)"
+            )
+            self._codec_format = codec_format
+            self.player.set_audio_output_format(*codec_format)
@@ -1,11 +1,9 @@
 from __future__ import annotations
 import logging
 from threading import Thread
-import time
-from typing import TYPE_CHECKING
+from typing import Any, Dict, TYPE_CHECKING
 
 from bot.player import State
-from bot import app_vars
 
 if TYPE_CHECKING:
     from bot import Bot
@@ -18,61 +16,59 @@ class TTPlayerConnector(Thread):
         self.player = bot.player
         self.ttclient = bot.ttclient
         self.translator = bot.translator
+        # Audio inserted through the bridge is transmitted without the input device
+        self.voice_transmission = not self.player.audio_bridge_file
+        self.events = self.player.subscribe()
 
     def run(self):
         last_player_state = State.Stopped
-        last_track_meta = {"name": None, "url": None}
-        self._close = False
-        while not self._close:
+        last_track_meta: Dict[str, Any] = {"name": None, "url": None}
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            state, track_meta = event
             try:
-                if self.player.state != last_player_state:
-                    last_player_state = self.player.state
-                    if self.player.state == State.Playing:
-                        self.ttclient.enable_voice_transmission()
-                        last_track_meta = self.player.track.get_meta()
-                        if self.player.track.name:
-                            self.ttclient.change_status_text(
-                                self.translator.translate(
-                                    "Playing: {track_name}"
-                                ).format(track_name=self.player.track.name)
-                            )
-                        else:
-                            self.ttclient.change_status_text(
-                                self.translator.translate(
-                                    "Playing: {stream_url}"
-                                ).format(stream_url=self.player.track.url)
-                            )
-                    elif self.player.state == State.Stopped:
-                        self.ttclient.disable_voice_transmission()
+                if state != last_player_state:
+                    if state == State.Playing:
+                        if self.voice_transmission:
+                            self.ttclient.enable_voice_transmission()
+                        self._change_status("Playing", track_meta)
+                    elif state == State.Stopped:
+                        if self.voice_transmission:
+                            self.ttclient.disable_voice_transmission()
                         self.ttclient.change_status_text("")
-                    elif self.player.state == State.Paused:
-                        self.ttclient.disable_voice_transmission()
-                        if self.player.track.name:
-                            self.ttclient.change_status_text(
-                                self.translator.translate(
-                                    "Paused: {track_name}"
-                                ).format(track_name=self.player.track.name)
-                            )
-                        else:
-                            self.ttclient.change_status_text(
-                                self.translator.translate(
-                                    "Paused: {stream_url}"
-                                ).format(stream_url=self.player.track.url)
-                            )
-                if (
-                    self.player.track.get_meta() != last_track_meta
-                    and last_player_state != State.Stopped
-                ):
-                    last_track_meta = self.player.track.get_meta()
+                    elif state == State.Paused:
+                        if self.voice_transmission:
+                            self.ttclient.disable_voice_transmission()
+                        self._change_status("Paused", track_meta)
+                elif track_meta != last_track_meta and state != State.Stopped:
                     self.ttclient.change_status_text(
                         "{state}: {name}".format(
                             state=self.ttclient.status.split(":")[0],
-                            name=self.player.track.name,
+                            name=track_meta["name"],
                         )
                     )
             except Exception:
                 logging.error("", exc_info=True)
-            time.sleep(app_vars.loop_timeout)
+            last_player_state = state
+            last_track_meta = track_meta
 
     def close(self):
-        self._close = True
+        self.events.put(None)
+
+    def _change_status(self, state: str, track_meta: Dict[str, Any]) -> None:
+        if track_meta["name"]:
+            if state == "Playing":
+                text = self.translator.translate("Playing: {track_name}")
+            else:
+                text = self.translator.translate("Paused: {track_name}")
+            self.ttclient.change_status_text(
+                text.format(track_name=track_meta["name"])
+            )
+        else:
+            if state == "Playing":
+                text = self.translator.translate("Playing: {stream_url}")
+            else:
+                text = self.translator.translate("Paused: {stream_url}")
+            self.ttclient.change_status_text(text.format(stream_url=track_meta["url"]))
@@ -26,6 +26,14 @@ class ServiceError(Exception):
     pass
 
 
+class ServiceBusyError(ServiceError):
+    pass
+
+
+class CircuitOpenError(ServiceError):
+    pass
+
+
 class NothingFoundError(Exception):
     pass
 
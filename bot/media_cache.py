@@ -0,0 +1,264 @@
+from __future__ import annotations
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Callable, List, Optional, Tuple, TYPE_CHECKING
+
+from bot import utils
+from bot.single_flight import flights
+
+if TYPE_CHECKING:
+    from bot import Bot
+    from bot.player.track import Track
+
+
+# ffmpeg arguments that turn a captured stream into a download format
+conversion_options = {
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "320k"],
+    "m4a": ["-c:a", "aac", "-b:a", "192k"],
+    "opus": ["-c:a", "libopus", "-b:a", "160k"],
+}
+
+
+class MediaCache:
+    def __init__(self, bot: Bot) -> None:
+        config = bot.config.downloads
+        self.directory = self._get_path(bot, config.cache_directory)
+        self.local_directory = self._get_path(bot, config.local_directory)
+        self.max_size = config.cache_size * 1024 * 1024
+        self.audio_format = config.audio_format
+        self.play_from_cache = config.play_from_cache
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, Tuple[str, int]] = OrderedDict()
+        # Called with every track and cached file handed out or added
+        self.listeners: List[Callable[[Track, str], None]] = []
+        self._size = 0
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._scan()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get_key(
+        self, track: Track, video: bool = False, audio_format: Optional[str] = None
+    ) -> Optional[str]:
+        video_id = track.get_video_id()
+        if not video_id:
+            return None
+        format = "video" if video else audio_format or self.audio_format
+        return hashlib.sha256(
+            f"{track.service}:{video_id}:{format}".encode("utf-8")
+        ).hexdigest()
+
+    def get(
+        self, track: Track, video: bool = False, audio_format: Optional[str] = None
+    ) -> Optional[str]:
+        if not self.enabled:
+            return None
+        key = self.get_key(track, video=video, audio_format=audio_format)
+        if not key:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            path, _ = entry
+            if not os.path.isfile(path):
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def download(
+        self,
+        track: Track,
+        directory: str,
+        video: bool = False,
+        audio_format: Optional[str] = None,
+    ) -> str:
+        """Puts the track into ``directory``, downloading it only on a cache miss.
+
+        The returned file has a human readable name and is a hard link to the
+        cached copy, so callers may move or delete it freely.
+        """
+        key = None
+        if self.enabled:
+            key = self.get_key(track, video=video, audio_format=audio_format)
+        if not key:
+            return track.download(directory, video=video, audio_format=audio_format)
+        for _ in range(2):
+            path = self.get(track, video=video, audio_format=audio_format)
+            if path:
+                logging.info(f"MediaCache: Hit for {track.name}")
+            else:
+                # The key covers service, video ID and format, so concurrent
+                # requests for the same download wait for one fetch
+                path = flights.do(
+                    key, self._get_or_fetch, track, key, video, audio_format
+                )
+            file_name = utils.clean_file_name(track.name + os.path.splitext(path)[1])
+            destination = os.path.join(directory, file_name)
+            # Eviction happens under the lock too, so the file can't go away
+            # while it is linked
+            with self._lock:
+                if self._entries.get(key, (None,))[0] == path and os.path.isfile(path):
+                    self.link(path, destination)
+                    break
+            logging.info(f"MediaCache: {track.name} was evicted before linking")
+        else:
+            return track.download(directory, video=video, audio_format=audio_format)
+        self._notify(track, path)
+        return destination
+
+    def link(self, source: str, destination: str) -> str:
+        if os.path.exists(destination):
+            os.remove(destination)
+        try:
+            os.link(source, destination)
+        except OSError:
+            # Different file systems or no hard link support
+            shutil.copyfile(source, destination)
+        return destination
+
+    def add(self, track: Track, file_path: str, audio_format: str) -> Optional[str]:
+        """Moves a file that already holds the track, like a captured stream,
+        into the cache."""
+        key = self.get_key(track, audio_format=audio_format) if self.enabled else None
+        if not key:
+            return None
+        path = self._insert(key, file_path)
+        self._notify(track, path)
+        return path
+
+    def _notify(self, track: Track, path: str) -> None:
+        for listener in self.listeners:
+            try:
+                listener(track, path)
+            except Exception as e:
+                logging.error(f"MediaCache: Listener failed: {e}")
+
+    def _get_or_fetch(
+        self, track: Track, key: str, video: bool, audio_format: Optional[str]
+    ) -> str:
+        # A fetch for this key may have finished since the caller looked
+        path = self.get(track, video=video, audio_format=audio_format)
+        if not path and not video:
+            path = self._convert_capture(track, key, audio_format)
+        if not path:
+            path = self._fetch(track, key, video, audio_format)
+        return path
+
+    def _fetch(
+        self, track: Track, key: str, video: bool, audio_format: Optional[str]
+    ) -> str:
+        # Downloading next to the cache keeps the final move a cheap rename
+        with tempfile.TemporaryDirectory(dir=self.directory, prefix=".tmp") as temp_dir:
+            file_path = track.download(temp_dir, video=video, audio_format=audio_format)
+            return self._insert(key, file_path)
+
+    def _convert_capture(
+        self, track: Track, key: str, audio_format: Optional[str]
+    ) -> Optional[str]:
+        audio_format = audio_format or self.audio_format
+        if audio_format == "native":
+            return None
+        source = self.get(track, audio_format="native")
+        if not source:
+            return None
+        source_ext = os.path.splitext(source)[1]
+        if audio_format == "opus" and source_ext in (".webm", ".opus"):
+            options = ["-c:a", "copy"]
+        elif audio_format == "m4a" and source_ext == ".m4a":
+            options = ["-c:a", "copy"]
+        elif audio_format in conversion_options:
+            options = conversion_options[audio_format]
+        else:
+            return None
+        with tempfile.TemporaryDirectory(dir=self.directory, prefix=".tmp") as temp_dir:
+            file_path = os.path.join(temp_dir, "track." + audio_format)
+            try:
+                subprocess.run(
+                    ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", source, "-vn"]
+                    + options
+                    + [file_path],
+                    check=True,
+                    capture_output=True,
+                )
+            except (OSError, subprocess.CalledProcessError) as e:
+                logging.warning(f"MediaCache: Failed to convert captured {track.name}: {e}")
+                return None
+            logging.info(f"MediaCache: Converted captured {track.name} to {audio_format}")
+            return self._insert(key, file_path)
+
+    def _insert(self, key: str, file_path: str) -> str:
+        path = os.path.join(self.directory, key[:2], key + os.path.splitext(file_path)[1])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(file_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (path, size)
+            self._size += size
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: str) -> None:
+        while self._size > self.max_size and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            path, _ = self._entries[key]
+            logging.debug(f"MediaCache: Evicting {path}")
+            self._remove(key)
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"MediaCache: Failed to remove {path}: {e}")
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._size -= entry[1]
+
+    def _scan(self) -> None:
+        files = []
+        for root, dirs, file_names in os.walk(self.directory):
+            # Leftovers of interrupted downloads
+            for name in [d for d in dirs if d.startswith(".tmp")]:
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                dirs.remove(name)
+            if root == self.directory:
+                # Only the key prefix directories, the stream proxy keeps its
+                # blocks next to them
+                dirs[:] = [d for d in dirs if len(d) == 2]
+                file_names = []
+            for name in file_names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, os.path.splitext(name)[0], path, stat.st_size))
+        # Least recently used first
+        for _, key, path, size in sorted(files):
+            self._entries[key] = (path, size)
+            self._size += size
+        if self._size > self.max_size and self._entries:
+            self._evict(keep=next(reversed(self._entries)))
+        logging.debug(
+            f"MediaCache: {len(self._entries)} files, {self._size / 1024 / 1024:.1f} MB"
+        )
+
+    def _get_path(self, bot: Bot, path: str) -> str:
+        if os.path.isabs(path):
+            return path
+        return os.path.join(bot.config_manager.config_dir, path)
@@ -12,7 +12,19 @@ def to_v1(cache_data: cache_data_type) -> cache_data_type:
     return update_version(cache_data, 1)
 
 
-migrate_functs = {1: to_v1}
+def to_v2(cache_data: cache_data_type) -> cache_data_type:
+    cache_data = dict(cache_data)
+    cache_data.setdefault("expiring_files", [])
+    return update_version(cache_data, 2)
+
+
+def to_v3(cache_data: cache_data_type) -> cache_data_type:
+    cache_data = dict(cache_data)
+    cache_data.setdefault("loudness", {})
+    return update_version(cache_data, 3)
+
+
+migrate_functs = {1: to_v1, 2: to_v2, 3: to_v3}
 
 
 def migrate(
@@ -38,5 +50,7 @@ def migrate(
 
 def update_version(cache_data: cache_data_type, version: int) -> cache_data_type:
     _cache_data = {"cache_version": version}
-    _cache_data.update(cache_data)
+    _cache_data.update(
+        {key: value for key, value in cache_data.items() if key != "cache_version"}
+    )
     return _cache_data
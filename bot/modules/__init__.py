@@ -1,6 +1,8 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING
 
+from bot.modules.batch_downloader import BatchDownloader
+from bot.modules.file_reaper import FileReaper
 from bot.modules.uploader import Uploader
 from bot.modules.playlist_uploader import PlaylistUploader
 from bot.modules.shortener import Shortener
@@ -21,5 +23,7 @@ class ModuleManager:
         )
         self.streamer = Streamer(bot)
         # self.task_scheduler = TaskScheduler(bot)
+        self.file_reaper = FileReaper(bot)
         self.uploader = Uploader(bot)
         self.playlist_uploader = PlaylistUploader(bot)
+        self.batch_downloader = BatchDownloader(bot)
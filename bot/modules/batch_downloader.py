@@ -0,0 +1,225 @@
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List
+
+from bot.modules.zip_writer import ZipWriter
+from bot.player.enums import TrackType
+from bot.player.track import Track
+from bot.TeamTalk.structs import User
+
+if TYPE_CHECKING:
+    from bot import Bot
+
+
+class BatchMode:
+    Upload = "upload"
+    Local = "local"
+    Zip = "zip"
+    LocalZip = "local_zip"
+
+
+class BatchJob:
+    def __init__(self, links: List[str], user: User, mode: str) -> None:
+        self.links = links
+        self.user = user
+        self.mode = mode
+        self.resolved = 0
+        self.tracks = 0
+        self.transferred = 0
+        self.errors = 0
+        self.last_report = 0.0
+        self.lock = threading.Lock()
+
+
+class BatchDownloader:
+    """Runs ``ads`` link lists.
+
+    Links are resolved on one bounded pool and tracks are downloaded or uploaded
+    on another, so slow extraction never stalls transfers and the server never
+    sees more than ``transfer_workers`` uploads at once.
+    """
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self.config = bot.config.downloads
+        self.media_cache = bot.media_cache
+        self.ttclient = bot.ttclient
+        self.translator = bot.translator
+        self._resolve_executor = ThreadPoolExecutor(
+            max_workers=max(1, self.config.resolve_workers),
+            thread_name_prefix="BatchResolver",
+        )
+        self._transfer_executor = ThreadPoolExecutor(
+            max_workers=max(1, self.config.transfer_workers),
+            thread_name_prefix="BatchTransfer",
+        )
+        self._jobs: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, links: List[str], user: User, mode: str) -> bool:
+        """Starts a job, returning False when the user has used up their quota."""
+        with self._lock:
+            active_jobs = self._jobs.get(user.id, 0)
+            if active_jobs >= self.config.max_jobs_per_user > 0:
+                return False
+            self._jobs[user.id] = active_jobs + 1
+        job = BatchJob(links, user, mode)
+        threading.Thread(target=self.run, daemon=True, args=(job,)).start()
+        return True
+
+    def run(self, job: BatchJob) -> None:
+        logging.info(
+            f"BatchDownloader started for {len(job.links)} links ({job.mode}) requested by {job.user.username}"
+        )
+        start_time = time.perf_counter()
+        try:
+            if job.mode == BatchMode.Upload:
+                self._transfer(job, self._upload)
+            elif job.mode == BatchMode.Local:
+                directory = os.path.join(self.media_cache.local_directory, "music")
+                os.makedirs(directory, exist_ok=True)
+                self._transfer(job, lambda track: self._download(track, directory))
+            elif job.mode == BatchMode.Zip:
+                tracks = [track for tracks in self._resolve(job) for track in tracks]
+                if tracks:
+                    # The playlist uploader reports the transfer itself
+                    self._report(job, final=True)
+                    self.bot.module_manager.playlist_uploader.run(
+                        tracks, job.user, "Compressed Links"
+                    )
+                    return
+            elif job.mode == BatchMode.LocalZip:
+                self._zip_local(job)
+        except Exception as e:
+            logging.error(f"BatchDownloader error: {e}", exc_info=True)
+            self.ttclient.send_message(
+                self.translator.translate("Error: {}").format(str(e)),
+                job.user,
+            )
+            return
+        finally:
+            with self._lock:
+                self._jobs[job.user.id] -= 1
+                if not self._jobs[job.user.id]:
+                    del self._jobs[job.user.id]
+        duration = time.perf_counter() - start_time
+        logging.info(f"BatchDownloader finished {job.transferred} tracks in {duration:.2f}s")
+        self._report(job, final=True)
+
+    def _resolve(self, job: BatchJob) -> Iterator[List[Track]]:
+        futures: Dict[Future[List[Track]], str] = {
+            self._resolve_executor.submit(
+                self.bot.module_manager.streamer.get, link, job.user.is_admin
+            ): link
+            for link in job.links
+        }
+        for future in as_completed(futures):
+            try:
+                tracks = future.result()
+            except Exception as e:
+                logging.error(f"BatchDownloader: Failed to resolve {futures[future]}: {e}")
+                tracks = []
+            with job.lock:
+                job.resolved += 1
+                job.tracks += len(tracks)
+                if not tracks:
+                    job.errors += 1
+            self._report(job)
+            yield tracks
+
+    def _transfer(self, job: BatchJob, function: Callable[[Track], Any]) -> None:
+        futures = [
+            self._transfer_executor.submit(self._run_transfer, job, function, track)
+            for tracks in self._resolve(job)
+            for track in tracks
+        ]
+        for future in futures:
+            future.result()
+
+    def _run_transfer(
+        self, job: BatchJob, function: Callable[[Track], Any], track: Track
+    ) -> Any:
+        try:
+            result = function(track)
+            with job.lock:
+                job.transferred += 1
+        except Exception as e:
+            logging.error(f"BatchDownloader: Failed to transfer {track.name}: {e}")
+            result = None
+            with job.lock:
+                job.errors += 1
+        self._report(job)
+        return result
+
+    def _upload(self, track: Track) -> None:
+        # Raises instead of messaging the user, failures end up in the report
+        self.bot.module_manager.uploader.upload(track)
+
+    def _download(self, track: Track, directory: str) -> str:
+        if track.type == TrackType.Dynamic:
+            track.url
+        return self.media_cache.download(track, directory)
+
+    def _zip_local(self, job: BatchJob) -> None:
+        directory = os.path.join(self.media_cache.local_directory, "zips")
+        os.makedirs(directory, exist_ok=True)
+        folder_name = "Compressed_Links"
+        zip_name = folder_name
+        counter = 1
+        while os.path.exists(os.path.join(directory, zip_name + ".zip")):
+            zip_name = f"{folder_name}_{counter}"
+            counter += 1
+        with tempfile.TemporaryDirectory() as temp_dir, ZipWriter(
+            directory,
+            zip_name,
+            folder_name,
+            self.config.zip_max_size * 1024 * 1024,
+        ) as zip_writer:
+            futures = []
+            for index, track in enumerate(
+                track for tracks in self._resolve(job) for track in tracks
+            ):
+                # Each track gets its own directory so equally named tracks don't collide
+                track_dir = os.path.join(temp_dir, str(index))
+                os.makedirs(track_dir)
+                futures.append(
+                    self._transfer_executor.submit(
+                        self._run_transfer,
+                        job,
+                        lambda track, track_dir=track_dir: self._download(track, track_dir),
+                        track,
+                    )
+                )
+            # The archive is only written from this thread
+            for future in as_completed(futures):
+                file_path = future.result()
+                if file_path:
+                    zip_writer.add(file_path)
+
+    def _report(self, job: BatchJob, final: bool = False) -> None:
+        with job.lock:
+            now = time.monotonic()
+            if not final and now - job.last_report < self.config.progress_interval:
+                return
+            job.last_report = now
+            if final:
+                message = self.translator.translate(
+                    "Batch finished: {transferred}/{tracks} tracks from {links} links, {errors} error(s)"
+                )
+            else:
+                message = self.translator.translate(
+                    "Resolved {resolved}/{links} links, transferred {transferred}/{tracks} tracks, {errors} error(s)"
+                )
+            message = message.format(
+                resolved=job.resolved,
+                links=len(job.links),
+                transferred=job.transferred,
+                tracks=job.tracks,
+                errors=job.errors,
+            )
+        self.ttclient.send_message(message, job.user)
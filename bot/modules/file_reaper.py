@@ -0,0 +1,80 @@
+from __future__ import annotations
+import heapq
+import logging
+import threading
+import time
+from typing import List, Tuple, TYPE_CHECKING
+
+from bot.TeamTalk.structs import State
+
+if TYPE_CHECKING:
+    from bot import Bot
+
+
+class FileReaper(threading.Thread):
+    """Deletes uploaded files from channels once they expire.
+
+    Pending deletions are kept as a heap of (deadline, channel ID, file ID) in
+    the cache, so files uploaded before a restart are still removed.
+    """
+
+    def __init__(self, bot: Bot):
+        super().__init__(daemon=True)
+        self.name = "FileReaperThread"
+        self.cache = bot.cache
+        self.cache_manager = bot.cache_manager
+        self.ttclient = bot.ttclient
+        self._condition = threading.Condition()
+        self._close = False
+        heapq.heapify(self.cache.expiring_files)
+
+    def schedule(self, channel_id: int, file_id: int, timeout: float) -> None:
+        with self._condition, self.cache_manager.lock:
+            heapq.heappush(
+                self.cache.expiring_files, (time.time() + timeout, channel_id, file_id)
+            )
+            self._condition.notify()
+        self.cache_manager.save()
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._close:
+                    timeout = self._get_timeout()
+                    if timeout <= 0 and self.ttclient.state == State.CONNECTED:
+                        break
+                    # Until the bot is connected deletions can't be sent, so recheck
+                    # every second
+                    self._condition.wait(timeout if timeout > 0 else 1)
+                if self._close:
+                    return
+                files = self._pop_expired()
+            self._delete(files)
+            self.cache_manager.save()
+
+    def close(self) -> None:
+        with self._condition:
+            self._close = True
+            self._condition.notify()
+
+    def _get_timeout(self) -> float:
+        if not self.cache.expiring_files:
+            return 3600
+        return self.cache.expiring_files[0][0] - time.time()
+
+    def _pop_expired(self) -> List[Tuple[float, int, int]]:
+        files = []
+        now = time.time()
+        with self.cache_manager.lock:
+            while self.cache.expiring_files and self.cache.expiring_files[0][0] <= now:
+                files.append(heapq.heappop(self.cache.expiring_files))
+        return files
+
+    def _delete(self, files: List[Tuple[float, int, int]]) -> None:
+        # The commands are sent back to back without waiting for each reply
+        for _, channel_id, file_id in files:
+            try:
+                self.ttclient.delete_file(channel_id, file_id)
+            except Exception as e:
+                logging.error(f"FileReaper: Failed to delete file {file_id}: {e}")
+        logging.debug(f"FileReaper: Deleted {len(files)} expired file(s)")
@@ -4,14 +4,14 @@ import threading
 import time
 import os
 import tempfile
-import zipfile
-from typing import TYPE_CHECKING, List
-from queue import Empty
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, List, Optional
 
+from bot.modules.zip_writer import ZipWriter
 from bot.player.track import Track
 from bot.player.enums import TrackType
-from bot.TeamTalk.structs import ErrorType, User
-from bot import app_vars, utils
+from bot.TeamTalk.structs import User
+from bot import errors, utils
 
 if TYPE_CHECKING:
     from bot import Bot
@@ -21,6 +21,7 @@ class PlaylistUploader:
     def __init__(self, bot: Bot):
         self.bot = bot
         self.config = bot.config
+        self.media_cache = bot.media_cache
         self.ttclient = bot.ttclient
         self.translator = bot.translator
         self.current_status = {} # Track status per user/channel
@@ -47,42 +48,56 @@ class PlaylistUploader:
         # Unlimited playlist tracks allowed
         pass
 
-        error_exit = False
         temp_dir = tempfile.TemporaryDirectory()
         try:
-            downloaded_files = []
-            
             status_msg = self.translator.translate("Downloading playlist: {}").format(playlist_name)
             self.current_status[user_id] = status_msg
             self.ttclient.send_message(status_msg, user.id, 1) # 1 = UserMessage (Private)
 
-            for i, track in enumerate(tracks):
+            # Create ZIP file with subfolder; tracks are added as soon as they finish
+            folder_name = utils.clean_file_name(playlist_name)
+            downloaded_count = 0
+            start_time = time.perf_counter()
+            workers = self.config.downloads.workers or os.cpu_count() or 1
+            zip_writer = ZipWriter(
+                temp_dir.name,
+                folder_name,
+                folder_name,
+                self.config.downloads.zip_max_size * 1024 * 1024,
+            )
+
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="PlaylistDownloader"
+            ) as executor, zip_writer:
+                futures = [
+                    executor.submit(self._download_track, track, i, temp_dir.name)
+                    for i, track in enumerate(tracks)
+                ]
                 try:
-                    progress_info = f"{i+1}/{len(tracks)}"
-                    current_track_msg = self.translator.translate("Downloading track {}: {}").format(progress_info, track.name)
-                    self.current_status[user_id] = current_track_msg
-                    
-                    # Update user every few tracks or for small playlists to avoid spamming too much
-                    if len(tracks) <= 10 or (i + 1) % 5 == 0 or i == 0 or (i + 1) == len(tracks):
-                        self.ttclient.send_message(current_track_msg, user.id, 1)
-                    
-                    logging.info(f"PlaylistUploader: {current_track_msg}")
-                    
-                    # Fetch stream data if it's dynamic
-                    if track.type == TrackType.Dynamic:
-                        try:
-                            track.url # Trigger fetch
-                        except Exception as e:
-                            logging.warning(f"PlaylistUploader: Failed to fetch data for track {i+1}: {e}")
-                            continue
-
-                    file_path = track.download(temp_dir.name)
-                    downloaded_files.append(file_path)
-                except Exception as e:
-                    logging.error(f"PlaylistUploader: Failed to download track {i+1}: {e}")
-                    continue
+                    for done_count, future in enumerate(as_completed(futures), start=1):
+                        file_path = future.result()
+                        if file_path:
+                            zip_writer.add(file_path)
+                            downloaded_count += 1
+
+                        elapsed = time.perf_counter() - start_time
+                        rate = done_count / elapsed * 60 if elapsed > 0 else 0.0
+                        current_track_msg = self.translator.translate(
+                            "Downloaded {done}/{total} tracks ({rate:.1f} tracks/min)"
+                        ).format(done=done_count, total=len(tracks), rate=rate)
+                        self.current_status[user_id] = current_track_msg
+                        logging.info(f"PlaylistUploader: {current_track_msg}")
 
-            if not downloaded_files:
+                        # Update user every few tracks or for small playlists to avoid spamming too much
+                        if len(tracks) <= 10 or done_count % 5 == 0 or done_count == len(tracks):
+                            self.ttclient.send_message(current_track_msg, user.id, 1)
+                except BaseException:
+                    # Don't wait for the rest of the playlist after an error
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+            if not downloaded_count:
                 self.current_status.pop(user_id, None)
                 self.ttclient.send_message(
                     self.translator.translate("Error: Failed to download any tracks from this playlist."),
@@ -91,53 +106,10 @@ class PlaylistUploader:
                 )
                 return
 
-            zip_status = self.translator.translate("Zipping tracks...")
-            self.current_status[user_id] = zip_status
-            self.ttclient.send_message(zip_status, user.id, 1)
+            for zip_path in zip_writer.paths:
+                if not self._upload(zip_path, user):
+                    break
 
-            # Create ZIP file with subfolder
-            folder_name = utils.clean_file_name(playlist_name)
-            zip_filename = folder_name + ".zip"
-            zip_path = os.path.join(temp_dir.name, zip_filename)
-            
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for file in downloaded_files:
-                    # Write file into a subfolder inside the ZIP
-                    arcname = os.path.join(folder_name, os.path.basename(file))
-                    zipf.write(file, arcname)
-
-            upload_status = self.translator.translate("Uploading ZIP: {}").format(zip_filename)
-            self.current_status[user_id] = upload_status
-            logging.info(f"PlaylistUploader: Sending ZIP file '{zip_path}' to channel {self.ttclient.channel.id}")
-            self.ttclient.send_message(upload_status, user.id, 1)
-            
-            command_id = self.ttclient.send_file(self.ttclient.channel.id, zip_path)
-            
-            while True:
-                try:
-                    file = self.ttclient.uploaded_files_queue.get_nowait()
-                    if file.name == zip_filename:
-                        break
-                    else:
-                        self.ttclient.uploaded_files_queue.put(file)
-                except Empty:
-                    pass
-                try:
-                    error = self.ttclient.errors_queue.get_nowait()
-                    if error.command_id == command_id:
-                        logging.error(f"PlaylistUploader: Error uploading zip: {error.message} (Type: {error.type})")
-                        self.ttclient.send_message(
-                            self.translator.translate("Error: {}").format(error.message),
-                            user,
-                        )
-                        error_exit = True
-                        break
-                    else:
-                        self.ttclient.errors_queue.put(error)
-                except Empty:
-                    pass
-                time.sleep(app_vars.loop_timeout)
-                
         except Exception as e:
             logging.error(f"PlaylistUploader error: {e}", exc_info=True)
             self.ttclient.send_message(
@@ -149,5 +121,38 @@ class PlaylistUploader:
             logging.debug("PlaylistUploader: Cleaning up local temporary directory")
             temp_dir.cleanup()
 
-        if error_exit:
-            return
+    def _upload(self, zip_path: str, user: User) -> bool:
+        zip_filename = os.path.basename(zip_path)
+        upload_status = self.translator.translate("Uploading ZIP: {}").format(zip_filename)
+        self.current_status[user.id] = upload_status
+        logging.info(f"PlaylistUploader: Sending ZIP file '{zip_path}' to channel {self.ttclient.channel.id}")
+        self.ttclient.send_message(upload_status, user.id, 1)
+
+        try:
+            self.ttclient.upload_file(self.ttclient.channel.id, zip_path)
+            return True
+        except errors.TTEventError as e:
+            logging.error(f"PlaylistUploader: Error uploading zip: {e}")
+            self.ttclient.send_message(
+                self.translator.translate("Error: {}").format(e),
+                user,
+            )
+            return False
+
+    def _download_track(self, track: Track, index: int, directory: str) -> Optional[str]:
+        # Each track gets its own directory so equally named tracks don't collide
+        track_dir = os.path.join(directory, str(index))
+        try:
+            os.makedirs(track_dir)
+            # Fetch stream data if it's dynamic
+            if track.type == TrackType.Dynamic:
+                try:
+                    track.url # Trigger fetch
+                except Exception as e:
+                    logging.warning(f"PlaylistUploader: Failed to fetch data for track {index + 1}: {e}")
+                    return None
+            logging.info(f"PlaylistUploader: Downloading track {index + 1}: {track.name}")
+            return self.media_cache.download(track, track_dir)
+        except Exception as e:
+            logging.error(f"PlaylistUploader: Failed to download track {index + 1}: {e}")
+            return None
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import logging
+import os
+import zipfile
+from typing import List, Optional, Set
+
+
+class ZipWriter:
+    # Already compressed media gains nothing from deflate, so it is stored as is
+    stored_extensions = {
+        ".aac",
+        ".flac",
+        ".m4a",
+        ".mka",
+        ".mkv",
+        ".mp3",
+        ".mp4",
+        ".oga",
+        ".ogg",
+        ".opus",
+        ".webm",
+        ".zip",
+    }
+
+    def __init__(
+        self,
+        directory: str,
+        name: str,
+        folder_name: Optional[str] = None,
+        max_size: int = 0,
+    ) -> None:
+        self.directory = directory
+        self.name = name
+        self.folder_name = folder_name
+        self.max_size = max_size
+        self.paths: List[str] = []
+        self._arcnames: Set[str] = set()
+        self._zipf: Optional[zipfile.ZipFile] = None
+        self._size = 0
+
+    def __enter__(self) -> ZipWriter:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def add(self, file_path: str, remove: bool = True) -> None:
+        file_size = os.path.getsize(file_path)
+        arcname = self._get_arcname(os.path.basename(file_path))
+        # Local file header and central directory entry, both carrying the name
+        entry_size = file_size + 76 + 2 * len(arcname.encode("utf-8"))
+        if (
+            self._zipf is None
+            or (
+                self.max_size > 0
+                and self._size > 0
+                and self._size + entry_size > self.max_size
+            )
+        ):
+            self._open_next()
+        ext = os.path.splitext(file_path)[1].lower()
+        compress_type = (
+            zipfile.ZIP_STORED
+            if ext in self.stored_extensions
+            else zipfile.ZIP_DEFLATED
+        )
+        self._zipf.write(file_path, arcname, compress_type=compress_type)
+        self._size += entry_size
+        if remove:
+            os.remove(file_path)
+
+    def close(self) -> List[str]:
+        if self._zipf is not None:
+            self._zipf.close()
+            self._zipf = None
+        return self.paths
+
+    def _open_next(self) -> None:
+        self.close()
+        if len(self.paths) == 1:
+            # The archive is being split, so the first one becomes part 1
+            first_part = os.path.join(self.directory, self._part_name(1))
+            os.rename(self.paths[0], first_part)
+            self.paths[0] = first_part
+        if self.paths:
+            file_name = self._part_name(len(self.paths) + 1)
+            logging.info(f"ZipWriter: Size limit reached, starting {file_name}")
+        else:
+            file_name = self.name + ".zip"
+        path = os.path.join(self.directory, file_name)
+        self._zipf = zipfile.ZipFile(path, "w")
+        self.paths.append(path)
+        self._size = 0
+
+    def _part_name(self, number: int) -> str:
+        return f"{self.name} - Part {number}.zip"
+
+    def _get_arcname(self, file_name: str) -> str:
+        name, ext = os.path.splitext(file_name)
+        arcname = self._join(file_name)
+        counter = 1
+        while arcname in self._arcnames:
+            arcname = self._join(f"{name} ({counter}){ext}")
+            counter += 1
+        self._arcnames.add(arcname)
+        return arcname
+
+    def _join(self, file_name: str) -> str:
+        if self.folder_name:
+            return os.path.join(self.folder_name, file_name)
+        return file_name
@@ -0,0 +1,201 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from enum import IntEnum
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING, Union
+
+from bot import errors
+
+if TYPE_CHECKING:
+    from bot.config.models import ServicesModel
+
+
+class Priority(IntEnum):
+    User = 0
+    Prefetch = 1
+    Autoplay = 2
+    KeepAlive = 3
+
+
+# Messages that mean upstream is refusing us rather than failing one request
+rejection_markers = (
+    "429",
+    "too many requests",
+    "sign in to confirm",
+    "unusual traffic",
+    "rate limit",
+    "403",
+)
+
+# A fixed priority, or a function returning the current one for requests that
+# can be raised while they wait
+PrioritySource = Union[Priority, Callable[[], Priority]]
+
+_local = threading.local()
+
+
+def get_priority_source() -> PrioritySource:
+    return getattr(_local, "priority", Priority.User)
+
+
+def get_priority() -> Priority:
+    source = get_priority_source()
+    return source() if callable(source) else source
+
+
+@contextmanager
+def priority(value: PrioritySource) -> Iterator[None]:
+    """Marks the requests made by this thread inside the block."""
+    previous = get_priority_source()
+    _local.priority = value
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def is_rejection(error: BaseException) -> bool:
+    message = str(error).lower()
+    return any(marker in message for marker in rejection_markers)
+
+
+class OutboundLimiter:
+    """Rate limits and guards all requests to YouTube.
+
+    Requests take tokens from one shared bucket and queue by priority, so user
+    requests overtake background work, which gives up first when it has waited
+    too long. A waiting request whose priority is raised moves up the queue.
+    After ``breaker_threshold`` rejections in a row every request
+    fails fast for ``breaker_timeout`` seconds, then a single trial request
+    decides whether to close the circuit again.
+    """
+
+    # Longest time a request waits for a token before it's dropped, in seconds
+    max_waits: Dict[Priority, float] = {
+        Priority.User: 30,
+        Priority.Prefetch: 10,
+        Priority.Autoplay: 5,
+        Priority.KeepAlive: 0,
+    }
+
+    def __init__(self, config: ServicesModel) -> None:
+        self.rate = config.requests_per_second
+        self.burst = max(1, config.request_burst)
+        self.breaker_threshold = config.breaker_threshold
+        self.breaker_timeout = config.breaker_timeout
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._waiters: List[Tuple[int, int]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._condition:
+            return self._opened_at is not None
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        if getattr(_local, "in_request", False):
+            # Part of a request that already holds a token
+            yield
+            return
+        trial = self._acquire()
+        _local.in_request = True
+        try:
+            yield
+        except errors.NothingFoundError:
+            self._record(False, trial)
+            raise
+        except Exception as e:
+            self._record(is_rejection(e), trial)
+            raise
+        else:
+            self._record(False, trial)
+        finally:
+            _local.in_request = False
+
+    def _acquire(self) -> bool:
+        """Waits for a token and returns whether this is the circuit's trial request."""
+        with self._condition:
+            trial = self._check_circuit()
+            if trial:
+                return True
+            start = time.monotonic()
+            entry = (get_priority(), next(self._counter))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    current = get_priority()
+                    if current < entry[0]:
+                        # Raised by a caller that waits for this request
+                        self._waiters.remove(entry)
+                        entry = (current, entry[1])
+                        self._waiters.append(entry)
+                        heapq.heapify(self._waiters)
+                    self._refill()
+                    if self._waiters[0] == entry and self._tokens >= 1:
+                        self._tokens -= 1
+                        return False
+                    now = time.monotonic()
+                    deadline = start + self.max_waits[entry[0]]
+                    if now >= deadline:
+                        raise errors.ServiceBusyError(
+                            f"Outbound request dropped ({entry[0].name})"
+                        )
+                    # Raised priorities aren't signalled, look again every second
+                    timeout = min(deadline - now, 1.0)
+                    if self._waiters[0] == entry and self.rate > 0:
+                        timeout = min(timeout, (1 - self._tokens) / self.rate)
+                    self._condition.wait(timeout)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def _check_circuit(self) -> bool:
+        if self._opened_at is None:
+            return False
+        if (
+            not self._trial_running
+            and time.monotonic() - self._opened_at >= self.breaker_timeout
+        ):
+            self._trial_running = True
+            return True
+        raise errors.CircuitOpenError("YouTube is rejecting requests")
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate <= 0:
+            self._tokens = float(self.burst)
+        else:
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last_refill) * self.rate
+            )
+        self._last_refill = now
+
+    def _record(self, rejected: bool, trial: bool) -> None:
+        with self._condition:
+            if trial:
+                self._trial_running = False
+            if not rejected:
+                if self._opened_at is not None:
+                    logging.info("OutboundLimiter: Circuit closed")
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if trial or (
+                self._opened_at is None and self._failures >= self.breaker_threshold > 0
+            ):
+                logging.warning(
+                    f"OutboundLimiter: Circuit opened for {self.breaker_timeout}s after {self._failures} rejection(s)"
+                )
+                self._opened_at = time.monotonic()
@@ -1,15 +1,23 @@
 from __future__ import annotations
 import html
 import logging
+import os
+import re
+from collections import deque
+from queue import Queue
+import tempfile
 import time
 import threading
-from typing import Any, Dict, Callable, List, Optional, TYPE_CHECKING
+from typing import Any, Deque, Dict, Callable, List, Optional, Tuple, TYPE_CHECKING
 import random
 
 import mpv
 
 from bot import errors
+from bot.outbound import Priority, priority
+from bot.player.buffering import BufferManager
 from bot.player.enums import Mode, State, TrackType
+from bot.player.loudness import LoudnessAnalyzer
 from bot.player.track import Track
 from bot.player.queue_manager import QueueManager
 from bot.sound_devices import SoundDevice, SoundDeviceType
@@ -19,11 +27,21 @@ if TYPE_CHECKING:
     from bot import Bot
 
 
+# (state, track metadata) published whenever either of them changes
+PlayerEvent = Tuple[State, Dict[str, Any]]
+
+
 class Player:
+    signature_delay = 2.0
+    # Tracks the time to first audio statistics are kept for
+    first_audio_samples = 100
+
     def __init__(self, bot: Bot):
         self.config = bot.config.player
         self.cache = bot.cache
         self.cache_manager = bot.cache_manager
+        self.media_cache = bot.media_cache
+        self.stream_proxy = bot.stream_proxy
         mpv_options = {
             "demuxer_lavf_o": "http_persistent=false",
             "demuxer_max_back_bytes": 524288,
@@ -33,21 +51,78 @@ class Player:
             "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/111.0.0.0 Safari/537.36",
             "ytdl": False,
         }
+        self.audio_bridge_file: Optional[str] = None
+        if self.config.audio_bridge:
+            self.audio_bridge_file = self._create_audio_bridge_file()
+        if self.audio_bridge_file:
+            # Raw PCM into a FIFO read by AudioBridge, which paces it in real time
+            mpv_options.update(
+                {
+                    "ao": "pcm",
+                    "ao_pcm_file": self.audio_bridge_file,
+                    "ao_pcm_waveheader": False,
+                    "audio_format": "s16",
+                    "audio_samplerate": 48000,
+                    "audio_channels": "stereo",
+                }
+            )
         mpv_options.update(self.config.player_options)
         try:
             self._player = mpv.MPV(**mpv_options, log_handler=self.log_handler)
         except AttributeError:
             del mpv_options["demuxer_max_back_bytes"]
             self._player = mpv.MPV(**mpv_options, log_handler=self.log_handler)
+        self.mpv_version = self._get_mpv_version()
         self._log_level = 5
+        self.buffering = BufferManager()
+        self.loudness = LoudnessAnalyzer(bot)
+        if self.loudness.enabled and self.mpv_version < (0, 36):
+            logging.info("[Player] mpv is older than 0.36, normalizing loudness with an audio filter")
+        self.media_cache.listeners.append(self.loudness.submit)
         self.track_list: List[Track] = []
         self.track: Track = Track()
         self.track_index: int = -1
-        self.state = State.Stopped
+        self._subscribers: List[Queue[Optional[PlayerEvent]]] = []
+        self._state = State.Stopped
         self.mode = Mode.TrackList
         self.volume = self.config.default_volume
 
         self.queue: QueueManager = QueueManager()
+        # Seconds from a play request to the first decoded audio
+        self.first_audio_times: Deque[float] = deque(maxlen=self.first_audio_samples)
+        self._requested_at: Optional[float] = None
+
+    @property
+    def state(self) -> State:
+        return self._state
+
+    @state.setter
+    def state(self, value: State) -> None:
+        changed = value != self._state
+        self._state = value
+        if changed:
+            self._publish()
+
+    def subscribe(self) -> Queue[Optional[PlayerEvent]]:
+        """Returns a queue that receives a PlayerEvent on every state or track
+        change."""
+        queue: Queue[Optional[PlayerEvent]] = Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: Queue[Optional[PlayerEvent]]) -> None:
+        self._subscribers.remove(queue)
+
+    def _publish(self) -> None:
+        if not self._subscribers:
+            return
+        meta = (
+            self.track.get_meta()
+            if self._state != State.Stopped
+            else {"name": None, "url": None}
+        )
+        for queue in self._subscribers:
+            queue.put((self._state, meta))
 
     def initialize(self) -> None:
         logging.debug("Initializing player")
@@ -58,6 +133,16 @@ class Player:
         self.register_event_callback("end-file", self.on_end_file)
         self._player.observe_property("metadata", self.on_metadata_update)
         self._player.observe_property("media-title", self.on_metadata_update)
+        self._player.observe_property("paused-for-cache", self.on_paused_for_cache)
+        self._player.observe_property("playback-time", self.on_playback_time)
+        self._player.observe_property(
+            "demuxer-cache-duration",
+            lambda name, value: self.buffering.on_cache_duration(value),
+        )
+        self._player.observe_property(
+            "cache-buffering-state",
+            lambda name, value: self.buffering.on_buffering_state(value),
+        )
         logging.debug("Player callbacks registered")
 
     def close(self) -> None:
@@ -65,14 +150,21 @@ class Player:
         if self.state != State.Stopped:
             self.stop()
         self._player.terminate()
+        if self.audio_bridge_file:
+            try:
+                os.remove(self.audio_bridge_file)
+            except OSError:
+                pass
         logging.debug("Player closed")
 
     def play(
         self,
         tracks: Optional[List[Track]] = None,
         start_track_index: Optional[int] = None,
+        requested_at: Optional[float] = None,
     ) -> None:
         if tracks != None:
+            self._requested_at = requested_at or time.perf_counter()
             self.track_list = tracks
             if not start_track_index and self.mode == Mode.Random:
                 self.shuffle(True)
@@ -81,7 +173,7 @@ class Player:
             else:
                 self.track_index = start_track_index if start_track_index else 0
                 self.track = tracks[self.track_index]
-            self._play(self.track.url)
+            self._play()
         else:
             self._player.pause = False
         self._player.volume = self.volume
@@ -92,23 +184,43 @@ class Player:
         self._player.pause = True
 
     def stop(self) -> None:
+        self._requested_at = None
         self.state = State.Stopped
         self._player.stop()
+        self.buffering.finish()
         self.track_list = []
         self.track = Track()
         self.track_index = -1
 
-    def _play(self, arg: str, save_to_recents: bool = True) -> None:
+    def _play(self, save_to_recents: bool = True) -> None:
         if save_to_recents:
-            try:
-                if self.cache.recents[-1] != self.track_list[self.track_index]:
-                    self.cache.recents.append(
-                        self.track_list[self.track_index].get_raw()
-                    )
-            except:
-                self.cache.recents.append(self.track_list[self.track_index].get_raw())
+            with self.cache_manager.lock:
+                try:
+                    if self.cache.recents[-1] != self.track_list[self.track_index]:
+                        self.cache.recents.append(
+                            self.track_list[self.track_index].get_raw()
+                        )
+                except:
+                    self.cache.recents.append(self.track_list[self.track_index].get_raw())
             self.cache_manager.save()
+
+        if self.media_cache.play_from_cache:
+            # Looked up by video ID, so a hit skips resolving the track
+            cached_path = self.media_cache.get(self.track) or self.media_cache.get(
+                self.track, audio_format="native"
+            )
+            if cached_path:
+                # The track stays unresolved, so only its known name is used
+                logging.info(
+                    f"[Player] Playing {self.track._name or cached_path} from the media cache"
+                )
+                self._player.pause = False
+                self._load(cached_path, TrackType.Local)
+                self._set_playing()
+                threading.Timer(1.0, self._prefetch_next_track).start()
+                return
             
+        url = self.track.url
         # Apply headers dynamically if available in extra_info to prevent User-Agent/domain mismatches
         extra_info = getattr(self.track, "extra_info", None) or {}
         headers = extra_info.get("http_headers", {})
@@ -121,17 +233,96 @@ class Player:
             except Exception as e:
                 logging.debug(f"[Player] Failed to apply dynamic headers to MPV: {e}")
                 
-        # Sleep for 2.0 seconds as required by YouTube's rate limiting/signature check delay
-        # to prevent HTTP 403 Forbidden errors when loading media segments.
-        # Matches yt-dlp's internal downloader delay.
-        logging.info("[Player] Sleeping 2.0 seconds to comply with YouTube signature delay...")
-        time.sleep(2.0)
-        
+        # YouTube rejects media segments requested too soon after the URL was signed
+        # (HTTP 403), matching yt-dlp's internal downloader delay. Only the part of the
+        # delay that has not already elapsed since extraction is waited out, so tracks
+        # resolved ahead of time (prefetch, speculative resolve) start immediately.
+        delay = self._get_signature_delay(self.track)
+        if delay > 0:
+            logging.info(f"[Player] Sleeping {delay:.2f} seconds to comply with YouTube signature delay...")
+            time.sleep(delay)
+
         self._player.pause = False
-        self._player.play(arg)
+        self._load(self.stream_proxy.get_url(self.track, url), self.track.type)
+        self._set_playing()
         threading.Timer(1.0, self._prefetch_next_track).start()
 
+    def _set_playing(self) -> None:
+        # One event per track, a state change publishes by itself
+        if self._state == State.Playing:
+            self._publish()
+        else:
+            self.state = State.Playing
+
+    def _load(self, url: str, type: TrackType) -> None:
+        self.buffering.start(self.track._name or url, type)
+        # Per-file options, mpv restores its defaults for the next file
+        options = self.buffering.get_options(type)
+        gain = self.loudness.get_gain(self.track)
+        if gain is not None and self.mpv_version >= (0, 36):
+            options["volume-gain"] = round(gain, 2)
+        elif gain is not None:
+            # volume-gain is new in mpv 0.36, older ones get a filter. Quoted
+            # with its length since the value contains "="
+            volume = f"volume={gain:.2f}dB"
+            options["af"] = f"%{len(volume)}%{volume}"
+        elif self.loudness.enabled:
+            # Measured now, applied from the next play on
+            cached_path = self.media_cache.get(self.track) or self.media_cache.get(
+                self.track, audio_format="native"
+            )
+            if cached_path:
+                self.loudness.submit(self.track, cached_path)
+        if self.mpv_version >= (0, 38):
+            # mpv 0.38 added a playlist index argument in front of the options
+            self._player.command(
+                "loadfile", url, "replace", -1, mpv.MPV._encode_options(options)
+            )
+        else:
+            self._player.loadfile(url, **options)
+
+    def _get_mpv_version(self) -> Tuple[int, int]:
+        try:
+            match = re.search(r"(\d+)\.(\d+)", self._player.mpv_version)
+            return int(match.group(1)), int(match.group(2))
+        except Exception as e:
+            logging.warning(f"[Player] Failed to get the mpv version: {e}")
+            return 0, 0
+
+    def _get_signature_delay(self, track: Track) -> float:
+        if not track.service or track.type in (TrackType.Local, TrackType.Direct):
+            return 0.0
+        elapsed = time.perf_counter() - track.extracted_at
+        if elapsed < 0:
+            return 0.0
+        return max(0.0, self.signature_delay - elapsed)
+
+    def prefetch(self, track: Track) -> None:
+        """Starts resolving a dynamic track in the background.
+
+        The track lock makes a later ``track.url`` wait for this fetch instead of
+        running a second extraction.
+        """
+        if track.type != TrackType.Dynamic or track._is_fetched:
+            return
+        threading.Thread(
+            target=self._fetch_track, args=(track,), daemon=True
+        ).start()
+
+    def _fetch_track(self, track: Track) -> None:
+        try:
+            start_time = time.perf_counter()
+            _ = track.url
+            duration = (time.perf_counter() - start_time) * 1000
+            logging.info(f"Speculative resolve finished in {duration:.2f}ms for {track.name}")
+        except Exception as e:
+            logging.warning(f"Speculative resolve failed: {e}")
+
     def _prefetch_next_track(self) -> None:
+        with priority(Priority.Prefetch):
+            self._prefetch_next()
+
+    def _prefetch_next(self) -> None:
         try:
             # Se há faixa na fila, ela será a próxima — prefetch dela
             next_from_queue = self.queue.peek_next()
@@ -175,11 +366,11 @@ class Player:
         if next_track is None:
             return False
 
-        logging.info(f"Playing from queue: {next_track.name}")
+        logging.info(f"Playing from queue: {next_track._name or next_track._url}")
         self.track_list = [next_track]
         self.track_index = 0
         self.track = next_track
-        self._play(next_track.url)
+        self._play()
         self.state = State.Playing
         return True
 
@@ -238,7 +429,7 @@ class Player:
         if index < len(self.track_list) and index >= (0 - len(self.track_list)):
             self.track = self.track_list[index]
             self.track_index = self.track_list.index(self.track)
-            self._play(self.track.url)
+            self._play()
             self.state = State.Playing
         else:
             raise errors.IncorrectTrackIndexError()
@@ -304,6 +495,28 @@ class Player:
     def set_output_device(self, id: str) -> None:
         self._player.audio_device = id
 
+    def get_audio_output_format(self) -> Optional[Tuple[int, int]]:
+        """Returns the sample rate and channel count mpv currently outputs."""
+        params = self._player.audio_out_params
+        if not params:
+            return None
+        return params["samplerate"], params["channel-count"]
+
+    def set_audio_output_format(self, sample_rate: int, channels: int) -> None:
+        # mpv reinitializes the audio output right away
+        self._player.audio_samplerate = sample_rate
+        self._player.audio_channels = "mono" if channels == 1 else "stereo"
+
+    def _create_audio_bridge_file(self) -> Optional[str]:
+        if not hasattr(os, "mkfifo"):
+            logging.error("Audio bridge is not supported on this platform")
+            return None
+        path = os.path.join(tempfile.gettempdir(), f"TTMediaBot-{os.getpid()}.pcm")
+        if os.path.exists(path):
+            os.remove(path)
+        os.mkfifo(path)
+        return path
+
     def shuffle(self, enable: bool) -> None:
         if enable:
             self._index_list = [i for i in range(0, len(self.track_list))]
@@ -359,6 +572,31 @@ class Player:
                     except errors.NoNextTrackError:
                         self.stop()
 
+    def on_paused_for_cache(self, name: str, value: Optional[bool]) -> None:
+        options = self.buffering.on_paused_for_cache(value)
+        if not options:
+            return
+        # Grow the buffers of the track that stalled too, not just the next ones.
+        # File local, so mpv restores the defaults when the file ends
+        try:
+            self._player.file_local["demuxer-readahead-secs"] = options["demuxer-readahead-secs"]
+            self._player.file_local["demuxer-max-bytes"] = options["demuxer-max-bytes"]
+        except Exception as e:
+            logging.debug(f"[Player] Failed to resize demuxer cache: {e}")
+
+    def on_playback_time(self, name: str, value: Optional[float]) -> None:
+        requested_at = self._requested_at
+        if value is None or requested_at is None:
+            return
+        self._requested_at = None
+        duration = time.perf_counter() - requested_at
+        self.first_audio_times.append(duration)
+        logging.info(f"[Player] First audio {duration:.2f}s after the play request")
+
+    def get_first_audio_p50(self) -> Optional[float]:
+        times = sorted(self.first_audio_times)
+        return times[len(times) // 2] if times else None
+
     def on_metadata_update(self, name: str, value: Any) -> None:
         if self.state == State.Playing and (
             self.track.type == TrackType.Direct or self.track.type == TrackType.Local
@@ -371,4 +609,5 @@ class Player:
             except TypeError:
                 new_name = html.unescape(self._player.media_title)
             if self.track.name != new_name and new_name:
-                self.track.name = new_name
\ No newline at end of file
+                self.track.name = new_name
+                self._publish()
\ No newline at end of file
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from bot.player.enums import TrackType
+
+
+# (readahead in seconds, maximum demuxer cache in bytes, persistent HTTP)
+BufferProfile = Tuple[float, int, bool]
+
+buffer_profiles: Dict[TrackType, BufferProfile] = {
+    # Service streams, googlevideo drops reused connections after a while
+    TrackType.Default: (4, 1024 * 1024, False),
+    TrackType.Dynamic: (4, 1024 * 1024, False),
+    # Radio and HLS, many small requests to the same host
+    TrackType.Live: (10, 4 * 1024 * 1024, True),
+    TrackType.Direct: (4, 1024 * 1024, True),
+    TrackType.Local: (1, 256 * 1024, False),
+}
+
+
+class StallStats:
+    def __init__(self) -> None:
+        self.tracks = 0
+        self.stalled_tracks = 0
+        self.stalls = 0
+        self.stall_time = 0.0
+
+
+class BufferManager:
+    """Chooses mpv's demuxer buffering per track type and records stalls.
+
+    Every stall doubles the buffer of the current track type, up to
+    ``max_scale`` times the base profile, and every track that plays through
+    without stalling halves it again.
+    """
+
+    max_scale = 8
+
+    def __init__(self) -> None:
+        self.stats: Dict[TrackType, StallStats] = {
+            type: StallStats() for type in buffer_profiles
+        }
+        self._scales: Dict[TrackType, int] = {type: 1 for type in buffer_profiles}
+        self._lock = threading.Lock()
+        self._track_name: Optional[str] = None
+        self._track_type = TrackType.Default
+        self._stalls = 0
+        self._stall_time = 0.0
+        self._stall_start: Optional[float] = None
+        self._cache_duration: Optional[float] = None
+        self._buffering_state: Optional[int] = None
+
+    def get_options(self, type: TrackType) -> Dict[str, Any]:
+        """Returns per-file mpv options for a track of the given type."""
+        readahead, max_bytes, persistent = buffer_profiles[type]
+        with self._lock:
+            scale = self._scales[type]
+        return {
+            "demuxer-readahead-secs": readahead * scale,
+            "demuxer-max-bytes": max_bytes * scale,
+            "demuxer-lavf-o": f"http_persistent={'true' if persistent else 'false'}",
+        }
+
+    def start(self, name: str, type: TrackType) -> None:
+        self.finish()
+        with self._lock:
+            self._track_name = name
+            self._track_type = type
+            self._stalls = 0
+            self._stall_time = 0.0
+            self._stall_start = None
+
+    def finish(self) -> None:
+        with self._lock:
+            if self._track_name is None:
+                return
+            if self._stall_start is not None:
+                # Still stalled when the track was left
+                self._stalls += 1
+                self._stall_time += time.monotonic() - self._stall_start
+            type = self._track_type
+            stats = self.stats[type]
+            stats.tracks += 1
+            if self._stalls:
+                stats.stalled_tracks += 1
+                stats.stalls += self._stalls
+                stats.stall_time += self._stall_time
+                logging.info(
+                    f"BufferManager: {self._track_name} stalled {self._stalls} time(s) for {self._stall_time:.1f}s"
+                )
+            elif self._scales[type] > 1:
+                self._scales[type] //= 2
+            self._track_name = None
+
+    def on_paused_for_cache(self, paused: Optional[bool]) -> Optional[Dict[str, Any]]:
+        """Returns mpv options to apply right away when a stall ends."""
+        with self._lock:
+            if self._track_name is None:
+                return None
+            if paused and self._stall_start is None:
+                self._stall_start = time.monotonic()
+                logging.debug(
+                    f"BufferManager: Stalled with {self._cache_duration or 0:.1f}s cached"
+                )
+                return None
+            if paused or self._stall_start is None:
+                return None
+            duration = time.monotonic() - self._stall_start
+            self._stall_start = None
+            self._stalls += 1
+            self._stall_time += duration
+            type = self._track_type
+            self._scales[type] = min(self._scales[type] * 2, self.max_scale)
+            logging.debug(
+                f"BufferManager: Resumed after {duration:.1f}s at {self._buffering_state}% buffered, scaling {type.name} buffers by {self._scales[type]}"
+            )
+        return self.get_options(type)
+
+    def on_cache_duration(self, duration: Optional[float]) -> None:
+        self._cache_duration = duration
+
+    def on_buffering_state(self, state: Optional[int]) -> None:
+        self._buffering_state = state
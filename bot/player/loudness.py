@@ -0,0 +1,108 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import re
+import subprocess
+import threading
+from typing import Optional, Set, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bot import Bot
+    from bot.player.track import Track
+
+
+re_integrated = re.compile(r"I:\s+(-?\d+(?:\.\d+)?) LUFS")
+
+
+class LoudnessAnalyzer:
+    """Measures the integrated loudness of tracks that reach the media cache.
+
+    Files are analyzed once, one at a time with ffmpeg's ebur128 filter, and the
+    result is kept in the cache by video ID. At playback the player only turns
+    it into mpv's volume-gain, so normalizing costs nothing per sample.
+    """
+
+    # Gain limits in dB, boosting too far clips quiet masters
+    min_gain = -15.0
+    max_gain = 6.0
+    # Measurements kept, the oldest are dropped first
+    max_entries = 10000
+
+    def __init__(self, bot: Bot) -> None:
+        self.cache = bot.cache
+        self.cache_manager = bot.cache_manager
+        self.enabled = bot.config.player.normalize_loudness
+        self.target = bot.config.player.target_loudness
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="LoudnessAnalyzer"
+        )
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def get_key(self, track: Track) -> Optional[str]:
+        video_id = track.get_video_id()
+        return f"{track.service}:{video_id}" if video_id else None
+
+    def get_gain(self, track: Track) -> Optional[float]:
+        if not self.enabled:
+            return None
+        key = self.get_key(track)
+        loudness = self.cache.loudness.get(key) if key else None
+        if loudness is None:
+            return None
+        return min(max(self.target - loudness, self.min_gain), self.max_gain)
+
+    def submit(self, track: Track, file_path: str) -> None:
+        if not self.enabled:
+            return
+        key = self.get_key(track)
+        if not key or key in self.cache.loudness:
+            return
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._executor.submit(self._analyze, key, track._name or file_path, file_path)
+
+    def _analyze(self, key: str, name: str, file_path: str) -> None:
+        try:
+            loudness = self.measure(file_path)
+        except Exception as e:
+            logging.warning(f"LoudnessAnalyzer: Failed to analyze {name}: {e}")
+            return
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+        logging.debug(f"LoudnessAnalyzer: {name}: {loudness:.1f} LUFS")
+        with self.cache_manager.lock:
+            self.cache.loudness[key] = loudness
+            while len(self.cache.loudness) > self.max_entries:
+                del self.cache.loudness[next(iter(self.cache.loudness))]
+        self.cache_manager.save()
+
+    def measure(self, file_path: str) -> float:
+        result = subprocess.run(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-hide_banner",
+                "-threads",
+                "1",
+                "-i",
+                file_path,
+                "-vn",
+                "-af",
+                "ebur128=framelog=quiet",
+                "-f",
+                "null",
+                "-",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # The summary at the end repeats the integrated loudness last
+        matches = re_integrated.findall(result.stderr)
+        if not matches:
+            raise ValueError("No loudness in ffmpeg output")
+        return float(matches[-1])
@@ -5,9 +5,11 @@ import os
 import time
 from threading import Lock
 from typing import Any, Dict, Optional, TYPE_CHECKING
+from urllib.parse import parse_qs, urlparse
 
 from bot.player.enums import TrackType
-from bot import utils
+from bot.single_flight import flights
+from bot import errors, utils
 
 if TYPE_CHECKING:
     from bot.services import Service
@@ -38,14 +40,29 @@ class Track:
         self._is_fetched = False
         self._fetch_failed = False
 
-    def download(self, directory: str, video: bool = False) -> str:
+    def download(
+        self, directory: str, video: bool = False, audio_format: Optional[str] = None
+    ) -> str:
         service: Service = get_service_by_name(self.service)
         format = self.format if not video else "mp4"
         file_name = self.name + "." + format
         file_name = utils.clean_file_name(file_name)
         file_path = os.path.join(directory, file_name)
-        service.download(self, file_path, video=video)
-        return file_path
+        return service.download(
+            self, file_path, video=video, audio_format=audio_format
+        )
+
+    def get_video_id(self) -> Optional[str]:
+        if self.type in (TrackType.Local, TrackType.Direct):
+            return None
+        extra_info = self.extra_info or {}
+        video_id = (
+            extra_info.get("id") or extra_info.get("videoId") or extra_info.get("contentId")
+        )
+        if not video_id and self.type == TrackType.Dynamic:
+            # Known from the watch URL before the stream is resolved
+            video_id = parse_qs(urlparse(self._url).query).get("v", [None])[0]
+        return str(video_id) if video_id else None
 
     def _fetch_stream_data(self):
         if self.type != TrackType.Dynamic or self._is_fetched or self._fetch_failed:
@@ -53,7 +70,17 @@ class Track:
         self._original_track = copy.deepcopy(self)
         service: Service = get_service_by_name(self.service)
         try:
-            track = service.get(self._url, extra_info=self.extra_info, process=True)[0]
+            # Other Track objects for the same video share a running resolve
+            track = flights.do(
+                (self.service, self.get_video_id() or self._url, "stream"),
+                service.get,
+                self._url,
+                extra_info=self.extra_info,
+                process=True,
+            )[0]
+        except (errors.ServiceBusyError, errors.CircuitOpenError):
+            # Not the track's fault, a later access tries again
+            raise
         except Exception as e:
             logging.error(f"Failed to fetch stream data for '{self._name or self._url}': {e}")
             self._fetch_failed = True
@@ -64,6 +91,7 @@ class Track:
         self.format = track.format
         self.type = track.type
         self.extra_info = track.extra_info
+        self.extracted_at = track.extracted_at
         self._is_fetched = True
 
     @property
@@ -78,6 +106,9 @@ class Track:
 
     @property
     def name(self) -> str:
+        # Known names don't wait for a running fetch
+        if self._name:
+            return self._name
         with self._lock:
             if not self._name:
                 self._fetch_stream_data()
@@ -88,10 +119,8 @@ class Track:
         self._name = value
 
     def get_meta(self) -> Dict[str, Any]:
-        try:
-            return {"name": self.name, "url": self.url}
-        except:
-            return {"name": None, "url": ""}
+        # Only what is known already, reading the properties could resolve the track
+        return {"name": self._name or None, "url": self._url}
 
     def get_raw(self) -> Track:
         if hasattr(self, "_original_track"):
@@ -1,11 +1,16 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import logging
+import os
+import time
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
 import downloader
+import resolver
 
 from bot import app_vars, errors
+from bot.outbound import OutboundLimiter
 
 if TYPE_CHECKING:
     from bot import Bot
@@ -13,6 +18,7 @@ if TYPE_CHECKING:
 
 
 class Service(ABC):
+    bot: Bot
     name: str
     is_enabled: bool
     hidden: bool
@@ -20,9 +26,74 @@ class Service(ABC):
     error_message: str
     warning_message: str
     help: str
+    audio_formats = ("mp3", "m4a", "opus", "native")
 
-    def download(self, track: Track, file_path: str, video: bool = False) -> None:
+    def download(
+        self,
+        track: Track,
+        file_path: str,
+        video: bool = False,
+        audio_format: Optional[str] = None,
+    ) -> str:
         downloader.download_file(track.url, file_path)
+        return file_path
+
+    def get_audio_download_options(self, audio_format: str) -> Dict[str, Any]:
+        # Only mp3 is always transcoded; the other formats keep the original
+        # audio stream and just remux it when the source codec already matches.
+        if audio_format == "m4a":
+            return {
+                "format": "ba[ext=m4a]/ba/bestaudio/best",
+                "postprocessors": [
+                    {"key": "FFmpegExtractAudio", "preferredcodec": "m4a"}
+                ],
+            }
+        elif audio_format == "opus":
+            return {
+                "format": "ba[acodec=opus]/ba/bestaudio/best",
+                "postprocessors": [
+                    {"key": "FFmpegExtractAudio", "preferredcodec": "opus"}
+                ],
+            }
+        elif audio_format == "native":
+            return {
+                "format": "ba/bestaudio/best",
+                "postprocessors": [
+                    {"key": "FFmpegExtractAudio", "preferredcodec": "best"}
+                ],
+            }
+        else:
+            return {
+                "postprocessors": [
+                    {
+                        "key": "FFmpegExtractAudio",
+                        "preferredcodec": "mp3",
+                        "preferredquality": "320",
+                    }
+                ],
+            }
+
+    def get_stream_format_options(self) -> Dict[str, Any]:
+        """Returns yt-dlp options picking the smallest audio stream whose bitrate
+        still exceeds the channel codec's, as everything is re-encoded to it anyway.
+
+        Falls back to the highest bitrate when no stream is good enough, and
+        returns nothing when the channel's bitrate is unknown.
+        """
+        if not self.bot.config.services.match_channel_bitrate:
+            return {}
+        try:
+            audio_codec = self.bot.ttclient.channel.audio_codec
+        except Exception:
+            return {}
+        if not audio_codec or not audio_codec.bitrate:
+            return {}
+        bitrate = audio_codec.bitrate // 1000
+        # Sorted from the lowest bitrate, so "ba" is the smallest and "wa" the largest
+        return {
+            "format": f"ba[abr>={bitrate}]/wa/bestaudio/best",
+            "format_sort": ["+abr"],
+        }
 
     @abstractmethod
     def get(
@@ -47,20 +118,39 @@ from bot.services.ytm import YtmService
 
 
 class ServiceManager:
+    # Latency counted for a failed search, in seconds
+    error_latency = 10.0
+    # How much faster than the default another service has to be to replace it
+    switch_ratio = 0.5
+
     def __init__(self, bot: Bot) -> None:
         self.config = bot.config.services
+        self.cache = bot.cache
+        self.cache_manager = bot.cache_manager
+        self.limiter = OutboundLimiter(self.config)
+        self.resolver = resolver.ResolverPool(
+            self.config.resolver_processes, warm=self.config.resolver_warm_processes
+        )
+        # As many as downloads run at once, started only when they are needed
+        self.downloader = resolver.ResolverPool(
+            bot.config.downloads.workers or os.cpu_count() or 1, "Downloader", warm=0
+        )
         self.services: Dict[str, Service] = {
             "yt": YtService(bot, self.config.yt),
             "ytm": YtmService(bot, self.config.ytm),
         }
         self.service: Service = self.services[self.config.default_service]
         self.fallback_service = app_vars.fallback_service
+        self.latencies: Dict[str, float] = {}
+        self._race_executor = ThreadPoolExecutor(thread_name_prefix="ServiceRace")
         import builtins
 
         builtins.__dict__["get_service_by_name"] = self.get_service_by_name
 
     def initialize(self) -> None:
         logging.debug("Initializing services")
+        self.resolver.start()
+        self.downloader.start()
         for service in self.services.values():
             if not service.is_enabled:
                 continue
@@ -73,6 +163,10 @@ class ServiceManager:
                     self.service = self.services[self.fallback_service]
         logging.debug("Services initialized")
 
+    def close(self) -> None:
+        self.resolver.close()
+        self.downloader.close()
+
     def get_service_by_name(self, name: str) -> Service:
         try:
             service = self.services[name]
@@ -81,3 +175,126 @@ class ServiceManager:
             return service
         except KeyError as e:
             raise errors.ServiceNotFoundError(str(e))
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Track]:
+        try:
+            if self.config.race_search:
+                services = [
+                    service
+                    for service in self.services.values()
+                    if service.is_enabled and not service.hidden
+                ]
+                if len(services) > 1:
+                    return self._race_search(services, query, limit)
+            return self._timed_search(self.service, query, limit)
+        except (errors.CircuitOpenError, errors.ServiceBusyError) as e:
+            tracks = self._search_local(query, limit)
+            if not tracks:
+                raise
+            logging.warning(f"Search for {query} answered from recents and favorites: {e}")
+            return tracks
+
+    def _search_local(self, query: str, limit: Optional[int]) -> List[Track]:
+        """Finds tracks by name among the recents and favorites."""
+        words = query.lower().split()
+        tracks: List[Track] = []
+        names = set()
+        # Copied, the player and commands change them from other threads
+        with self.cache_manager.lock:
+            candidates = list(reversed(self.cache.recents)) + [
+                track for favorites in self.cache.favorites.values() for track in favorites
+            ]
+        for track in candidates:
+            # The private name, reading the property could resolve the track
+            name = track._name or ""
+            if name in names or not all(word in name.lower() for word in words):
+                continue
+            names.add(name)
+            tracks.append(track)
+            if len(tracks) >= (limit or 1):
+                break
+        return tracks
+
+    def _race_search(
+        self, services: List[Service], query: str, limit: Optional[int]
+    ) -> List[Track]:
+        # The selected service goes first, then the historically fastest ones,
+        # so it wins when several results arrive in the same batch.
+        services.sort(
+            key=lambda s: (s != self.service, self.latencies.get(s.name, 0.0))
+        )
+        futures: Dict[Future[List[Track]], Service] = {
+            self._race_executor.submit(self._timed_search, service, query, limit): service
+            for service in services
+        }
+        pending = set(futures)
+        nothing_found = False
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: services.index(futures[f])):
+                try:
+                    tracks = future.result()
+                except errors.NothingFoundError:
+                    nothing_found = True
+                    continue
+                except Exception as e:
+                    logging.warning(
+                        f"Race search: {futures[future].name} failed: {e}"
+                    )
+                    error = e
+                    continue
+                for slower in pending:
+                    slower.cancel()
+                logging.info(f"Race search won by {futures[future].name} for query: {query}")
+                return tracks
+        if nothing_found:
+            raise errors.NothingFoundError("")
+        if isinstance(error, errors.ServiceError):
+            raise error
+        raise errors.ServiceError()
+
+    def _timed_search(
+        self, service: Service, query: str, limit: Optional[int]
+    ) -> List[Track]:
+        start_time = time.perf_counter()
+        try:
+            tracks = service.search(query, limit=limit)
+        except errors.NothingFoundError:
+            # A valid answer, however fast it came
+            self._record_latency(service, time.perf_counter() - start_time)
+            raise
+        except Exception:
+            # Failing fast must not make a broken backend look like the fastest
+            self._record_latency(
+                service, max(time.perf_counter() - start_time, self.error_latency)
+            )
+            raise
+        self._record_latency(service, time.perf_counter() - start_time)
+        return tracks
+
+    def _record_latency(self, service: Service, latency: float) -> None:
+        name = service.name
+        if name in self.latencies:
+            self.latencies[name] += 0.3 * (latency - self.latencies[name])
+        else:
+            self.latencies[name] = latency
+        if self.config.race_search:
+            self._update_default_service()
+
+    def _update_default_service(self) -> None:
+        """Makes a clearly faster service the default in race mode."""
+        current = self.latencies.get(self.service.name)
+        candidates = [
+            service
+            for service in self.services.values()
+            if service.is_enabled and not service.hidden and service.name in self.latencies
+        ]
+        if current is None or not candidates:
+            return
+        fastest = min(candidates, key=lambda s: self.latencies[s.name])
+        if fastest != self.service and self.latencies[fastest.name] < current * self.switch_ratio:
+            logging.info(
+                f"Race search: {fastest.name} is now the default service ({self.latencies[fastest.name]:.2f}s against {current:.2f}s for {self.service.name})"
+            )
+            self.service = fastest
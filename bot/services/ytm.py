@@ -6,8 +6,6 @@ import threading
 import os
 import json
 import http.cookiejar
-import shutil
-import tempfile
 import requests
 import httpx
 
@@ -36,18 +34,17 @@ class HTTP2Session(requests.Session):
             return resp
         except Exception as e:
             return super().request(method, url, **kwargs)
-from contextlib import contextmanager
-from typing import Any, Dict, List, Optional, TYPE_CHECKING, Generator
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from bot import Bot
 
-from yt_dlp import YoutubeDL
-from yt_dlp.downloader import get_suitable_downloader
-from yt_dlp.utils import DownloadError
 from ytmusicapi import YTMusic
 
+import resolver
+
 from bot.config.models import YtmModel
+from bot.outbound import Priority, priority
 from bot.player.enums import TrackType
 from bot.player.track import Track
 from bot.services import Service as _Service
@@ -67,7 +64,6 @@ class YtmService(_Service):
         self.hidden = False
         self.ytmusic = None
         self.yt_config = bot.config.services.yt
-        self._cookie_lock = threading.Lock()
         self._max_retries = 2
         
     def _fetch_and_queue_autoplay(self, video_id: str, original_url: str):
@@ -77,7 +73,8 @@ class YtmService(_Service):
             start_time = time.perf_counter()
             
             # radio=False ensures we get the "Up Next" / Autoplay queue
-            watch_playlist = (self.ytmusic or self.ytmusic_public).get_watch_playlist(videoId=video_id, limit=50, radio=False)
+            with priority(Priority.Autoplay), self.bot.service_manager.limiter.request():
+                watch_playlist = (self.ytmusic or self.ytmusic_public).get_watch_playlist(videoId=video_id, limit=50, radio=False)
             tracks_data = watch_playlist.get("tracks", [])
             
             new_tracks: List[Track] = []
@@ -203,7 +200,6 @@ class YtmService(_Service):
             "youtube_include_dash_manifest": False,
             "youtube_include_hls_manifest": False,
             "socket_timeout": 10,
-            "logger": logging.getLogger("root"),
             "quiet": True,
             "no_warnings": True,
             "nocheckcertificate": True,
@@ -232,7 +228,8 @@ class YtmService(_Service):
             try:
                 logging.info(f"YTM Service pre-warming (attempt {attempt}/3)...")
                 # Establish initial connection to YTM
-                self.ytmusic_public.search("music", filter="songs", limit=1)
+                with priority(Priority.KeepAlive), self.bot.service_manager.limiter.request():
+                    self.ytmusic_public.search("music", filter="songs", limit=1)
                 logging.info("YTM Service pre-warming finished successfully.")
                 return
             except Exception as e:
@@ -242,48 +239,28 @@ class YtmService(_Service):
                 else:
                     logging.error(f"YTM Pre-warming failed after 3 attempts: {e}")
 
-    @contextmanager
-    def _temp_cookie_file(self) -> Generator[Optional[str], None, None]:
-        if not self.yt_config.cookiefile_path or not os.path.isfile(self.yt_config.cookiefile_path):
-            yield None
-            return
-
-        import uuid
-        temp_cookie_path = os.path.join(
-            tempfile.gettempdir(), 
-            f"ytm_cookies_{os.getpid()}_{uuid.uuid4().hex}.txt"
-        )
-        
-        try:
-            with self._cookie_lock:
-                shutil.copy2(self.yt_config.cookiefile_path, temp_cookie_path)
-            yield temp_cookie_path
-        finally:
-            if os.path.isfile(temp_cookie_path):
-                try:
-                    os.remove(temp_cookie_path)
-                except Exception as e:
-                    logging.debug(f"Failed to remove temp cookie file {temp_cookie_path}: {e}")
-
-    def download(self, track: Track, file_path: str, video: bool = False) -> None:
+    def download(
+        self,
+        track: Track,
+        file_path: str,
+        video: bool = False,
+        audio_format: Optional[str] = None,
+    ) -> str:
         start_time = time.perf_counter()
         # Re-use YT Service logic or bare extraction
         # Since implementation plan said re-use logic:
         info = track.extra_info
         if not info:
-             super().download(track, file_path, video=video)
+             file_path = super().download(track, file_path, video=video)
              duration = (time.perf_counter() - start_time) * 1000
              logging.info(f"YTM Download finished in {duration:.2f}ms for {track.name}")
-             return
+             return file_path
         
         # Instantiate per request for thread safety
         config = self._ydl_config.copy()
         if not video:
-            config["postprocessors"] = [{
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": "320",
-            }]
+            audio_format = audio_format or self.bot.config.downloads.audio_format
+            config.update(self.get_audio_download_options(audio_format))
         else:
             config["format"] = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
             config["merge_output_format"] = "mp4"
@@ -300,21 +277,35 @@ class YtmService(_Service):
             elif "videoId" in track.extra_info:
                 url = f"https://music.youtube.com/watch?v={track.extra_info['videoId']}"
 
-        with self._temp_cookie_file() as cookie_file:
-            if cookie_file:
-                config["cookiefile"] = cookie_file
-            
-            with YoutubeDL(config) as ydl:
-                ydl.download([url])
+        downloaded_path = self.bot.service_manager.downloader.call(
+            "download",
+            config,
+            self.yt_config.cookiefile_path,
+            url,
+            timeout=self.bot.config.downloads.timeout,
+        )
 
         duration = (time.perf_counter() - start_time) * 1000
         logging.info(f"YTM Download finished in {duration:.2f}ms for {track.name}")
+        return downloaded_path or file_path
 
     def get(
         self,
         url: str,
         extra_info: Optional[Dict[str, Any]] = None,
         process: bool = False,
+    ) -> List[Track]:
+        if not process and extra_info and not url:
+            # Built from the given info without any request
+            return self._get(url, extra_info, process)
+        with self.bot.service_manager.limiter.request():
+            return self._get(url, extra_info, process)
+
+    def _get(
+        self,
+        url: str,
+        extra_info: Optional[Dict[str, Any]],
+        process: bool,
     ) -> List[Track]:
         start_time = time.perf_counter()
         if not (url or extra_info):
@@ -324,96 +315,88 @@ class YtmService(_Service):
         if process:
              # Instantiate per request for thread safety
              config = self._ydl_config.copy()
-             with self._temp_cookie_file() as cookie_file:
-                  if cookie_file:
-                       config["cookiefile"] = cookie_file
-                  
-                  with YoutubeDL(config) as ydl:
-                       # If we have extra_info, use it, otherwise extract from URL
-                       if extra_info:
-                            info = extra_info
-                            if "url" not in info and "videoId" in info:
-                                 url = f"https://www.youtube.com/watch?v={info['videoId']}"
-                                 try:
-                                     info = ydl.extract_info(url, process=False)
-                                 except DownloadError as e:
-                                     logging.error(f"YTM Get: yt-dlp DownloadError for '{url}': {e}")
-                                     raise errors.ServiceError(str(e))
-                       else:
-                            try:
-                                info = ydl.extract_info(url, process=False)
-                            except DownloadError as e:
-                                logging.error(f"YTM Get: yt-dlp DownloadError for '{url}': {e}")
-                                raise errors.ServiceError(str(e))
-                       
-                       if info is None:
-                            raise errors.ServiceError("Failed to extract video info")
-
-                       # Process stream
-                       try:
-                           stream = ydl.process_ie_result(info)
-                       except DownloadError as e:
-                           logging.error(f"YTM Get: Failed to process stream for '{url}': {e}")
-                           raise errors.ServiceError(str(e))
-                       if "url" in stream:
-                            url = stream["url"]
-                       else:
-                            raise errors.ServiceError("No stream URL found in processed result")
-                       
-                       title = stream.get("title", self.bot.translator.translate("Unknown"))
-                       if "uploader" in stream:
-                            title += " - {}".format(stream["uploader"])
-                       format = "mp3"
-                       
-                       duration = (time.perf_counter() - start_time) * 1000
-                       logging.info(f"YTM Get (Process) finished in {duration:.2f}ms for {title}")
-                  
-                  # TRIGGER BACKGROUND AUTOPLAY FETCH
-                  current_video_id = None
-                  if extra_info and "videoId" in extra_info:
-                       current_video_id = extra_info["videoId"]
-                  elif "id" in stream:
-                       current_video_id = stream["id"]
+             config.update(self.get_stream_format_options())
+             # If we have extra_info, use it, otherwise extract from URL
+             info = None
+             if extra_info:
+                  info = extra_info
+                  if "url" not in info and "videoId" in info:
+                       url = f"https://www.youtube.com/watch?v={info['videoId']}"
+                       info = None
+             try:
+                  info, stream = self.bot.service_manager.resolver.call(
+                       "extract",
+                       config,
+                       self.yt_config.cookiefile_path,
+                       url,
+                       info,
+                       True,
+                       timeout=self.yt_config.resolve_deadline,
+                  )
+             except resolver.ResolverBusyError as e:
+                  raise errors.ServiceBusyError(str(e))
+             except resolver.ResolveError as e:
+                  logging.error(f"YTM Get: yt-dlp error for '{url}': {e}")
+                  raise errors.ServiceError(str(e))
+             if stream and "url" in stream:
+                  url = stream["url"]
+             else:
+                  raise errors.ServiceError("No stream URL found in processed result")
+             
+             title = stream.get("title", self.bot.translator.translate("Unknown"))
+             if "uploader" in stream:
+                  title += " - {}".format(stream["uploader"])
+             format = "mp3"
+             
+             duration = (time.perf_counter() - start_time) * 1000
+             logging.info(f"YTM Get (Process) finished in {duration:.2f}ms for {title}")
+             
+             # TRIGGER BACKGROUND AUTOPLAY FETCH
+             current_video_id = None
+             if extra_info and "videoId" in extra_info:
+                  current_video_id = extra_info["videoId"]
+             elif "id" in stream:
+                  current_video_id = stream["id"]
+             
+             if current_video_id:
+                  should_fetch = False
+                  try:
+                       if self.bot.player.track_list:
+                            last_track = self.bot.player.track_list[-1]
+                            last_video_id = None
+                            if last_track.extra_info and 'videoId' in last_track.extra_info:
+                                 last_video_id = last_track.extra_info.get('videoId')
+                            
+                            if not last_video_id and hasattr(last_track, '_url') and last_track._url:
+                                 l_url = last_track._url
+                                 if "v=" in l_url:
+                                      last_video_id = l_url.split("v=")[1].split("&")[0]
+                                 elif "youtu.be" in l_url:
+                                      last_video_id = l_url.split("/")[-1]
+                            
+                            if last_video_id and last_video_id == current_video_id:
+                                 should_fetch = True
+                                 logging.info(f"[YTM] Autoplay trigger: Current track IS last track (ID match: {current_video_id})")
+                  except Exception as e:
+                       logging.debug(f"[YTM] Trace bot player state error: {e}")
                   
-                  if current_video_id:
-                       should_fetch = False
+                  if should_fetch:
                        try:
-                            if self.bot.player.track_list:
-                                 last_track = self.bot.player.track_list[-1]
-                                 last_video_id = None
-                                 if last_track.extra_info and 'videoId' in last_track.extra_info:
-                                      last_video_id = last_track.extra_info.get('videoId')
-                                 
-                                 if not last_video_id and hasattr(last_track, '_url') and last_track._url:
-                                      l_url = last_track._url
-                                      if "v=" in l_url:
-                                           last_video_id = l_url.split("v=")[1].split("&")[0]
-                                      elif "youtu.be" in l_url:
-                                           last_video_id = l_url.split("/")[-1]
-                                 
-                                 if last_video_id and last_video_id == current_video_id:
-                                      should_fetch = True
-                                      logging.info(f"[YTM] Autoplay trigger: Current track IS last track (ID match: {current_video_id})")
-                       except Exception as e:
-                            logging.debug(f"[YTM] Trace bot player state error: {e}")
-                       
-                       if should_fetch:
-                            try:
-                                 self.bot.loop.create_task(self._fetch_autoplay_async(current_video_id))
-                            except Exception:
-                                 threading.Thread(target=self._fetch_autoplay_sync, args=(current_video_id,), daemon=True).start()
-                  
-                  return [
-                       Track(
-                            service=self.name,
-                            name=title,
-                            url=url,
-                            type=TrackType.Default,
-                            format=format,
-                            extra_info=stream,
-                            extracted_at=time.perf_counter(),
-                       )
-                  ]
+                            self.bot.loop.create_task(self._fetch_autoplay_async(current_video_id))
+                       except Exception:
+                            threading.Thread(target=self._fetch_autoplay_sync, args=(current_video_id,), daemon=True).start()
+             
+             return [
+                  Track(
+                       service=self.name,
+                       name=title,
+                       url=url,
+                       type=TrackType.Default,
+                       format=format,
+                       extra_info=stream,
+                       extracted_at=time.perf_counter(),
+                  )
+             ]
 
         # If process=False, we are adding to queue (The "Radio" logic)
         if extra_info and not url:
@@ -465,12 +448,16 @@ class YtmService(_Service):
              return [Track(service=self.name, url=url, type=TrackType.Dynamic)]
 
     async def _fetch_autoplay_async(self, video_id: str) -> None:
-         self._fetch_autoplay_sync(video_id)
+         # Waits on the outbound limiter, which must not block the event loop
+         await asyncio.get_running_loop().run_in_executor(
+              None, self._fetch_autoplay_sync, video_id
+         )
 
     def _fetch_autoplay_sync(self, video_id: str) -> None:
          try:
               logging.info(f"[YTM] Fetching autoplay for {video_id}")
-              watch_playlist = (self.ytmusic or self.ytmusic_public).get_watch_playlist(videoId=video_id, limit=5)
+              with priority(Priority.Autoplay), self.bot.service_manager.limiter.request():
+                   watch_playlist = (self.ytmusic or self.ytmusic_public).get_watch_playlist(videoId=video_id, limit=5)
               
               if 'tracks' in watch_playlist:
                    new_tracks = []
@@ -500,7 +487,17 @@ class YtmService(_Service):
         if limit is None:
             limit = self.config.search_results
         start_time = time.perf_counter()
-        results = self.ytmusic_public.search(query, filter="songs", limit=limit)
+        service_manager = self.bot.service_manager
+        with service_manager.limiter.request():
+            if service_manager.resolver.processes:
+                try:
+                    results = service_manager.resolver.call(
+                        "search_songs", query, limit, timeout=self.yt_config.resolve_deadline
+                    )
+                except resolver.ResolverBusyError as e:
+                    raise errors.ServiceBusyError(str(e))
+            else:
+                results = self.ytmusic_public.search(query, filter="songs", limit=limit)
         if not results:
              raise errors.NothingFoundError("")
         
@@ -533,6 +530,7 @@ class YtmService(_Service):
             time.sleep(4)
             try:
                 if self.ytmusic_public and hasattr(self.ytmusic_public, "_session"):
-                     self.ytmusic_public._session.get("https://music.youtube.com/generate_204", timeout=5)
+                     with priority(Priority.KeepAlive), self.bot.service_manager.limiter.request():
+                          self.ytmusic_public._session.get("https://music.youtube.com/generate_204", timeout=5)
             except Exception:
                 pass
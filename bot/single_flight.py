@@ -0,0 +1,87 @@
+from __future__ import annotations
+from concurrent.futures import Future
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, TypeVar
+
+from bot import errors
+from bot.outbound import (
+    Priority,
+    PrioritySource,
+    get_priority,
+    get_priority_source,
+    priority,
+)
+
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self, priority: Priority) -> None:
+        self.future: Future[Any] = Future()
+        # The leader's own priority and the highest among all callers
+        self.leader_priority = priority
+        self.priority = priority
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time.
+
+    Callers that arrive while a call for their key is running wait for it and
+    get its result, or its exception, instead of starting their own. The call's
+    outbound requests run at the highest priority among its callers, and when
+    they are shed for load, callers that outrank the leader try again
+    themselves instead of sharing the error.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        own_priority = get_priority()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call(own_priority)
+                self._calls[key] = call
+                self.calls += 1
+            else:
+                call.priority = min(call.priority, own_priority)
+                self.shared += 1
+        if not leader:
+            logging.debug(f"SingleFlight: Waiting for the running call for {key}")
+            try:
+                return call.future.result()
+            except (errors.ServiceBusyError, errors.CircuitOpenError):
+                if own_priority >= call.leader_priority:
+                    raise
+            logging.debug(f"SingleFlight: Running call for {key} was shed, trying again")
+            return self.do(key, function, *args, **kwargs)
+        source = get_priority_source()
+        try:
+            with priority(lambda: min(self._get_priority(source), call.priority)):
+                result = function(*args, **kwargs)
+        except BaseException as e:
+            # Forgotten first, so callers trying again start a new call
+            self._remove(key)
+            call.future.set_exception(e)
+            raise
+        self._remove(key)
+        call.future.set_result(result)
+        return result
+
+    def _remove(self, key: Hashable) -> None:
+        with self._lock:
+            del self._calls[key]
+
+    def _get_priority(self, source: PrioritySource) -> Priority:
+        return source() if callable(source) else source
+
+
+# Resolves and downloads, keyed by (service, video ID, purpose)
+flights = SingleFlight()
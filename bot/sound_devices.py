@@ -31,6 +31,9 @@ class SoundDeviceManager:
         self.input_devices = self.ttclient.get_input_devices()
 
     def initialize(self) -> None:
+        if self.player.audio_bridge_file:
+            logging.debug("Audio bridge enabled, sound devices are not used")
+            return
         logging.debug("Initializing sound devices")
         try:
             self.player.set_output_device(
@@ -0,0 +1,417 @@
+from __future__ import annotations
+from collections import OrderedDict
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from bot.player.enums import TrackType
+from bot.single_flight import flights
+
+if TYPE_CHECKING:
+    from bot import Bot
+    from bot.player.track import Track
+
+
+re_range = re.compile(r"bytes=(\d+)-(\d*)")
+re_content_range = re.compile(r"bytes \d+-\d+/(\d+)")
+
+
+class StreamError(Exception):
+    pass
+
+
+class _Stream:
+    def __init__(self, key: str, track: Track, url: str) -> None:
+        self.key = key
+        self.track = track
+        self.url = url
+        self.format_id = (track.extra_info or {}).get("format_id")
+        self.headers: Dict[str, str] = dict(
+            (track.extra_info or {}).get("http_headers") or {}
+        )
+        self.size: Optional[int] = None
+        # The whole file, kept when upstream ignores Range requests
+        self.data: Optional[bytes] = None
+        self.captured = False
+        # Guards url and headers, never held while resolving
+        self.lock = threading.Lock()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _Server
+
+    def do_GET(self) -> None:
+        self.server.proxy.handle(self, send_body=True)
+
+    def do_HEAD(self) -> None:
+        self.server.proxy.handle(self, send_body=False)
+
+    def log_message(self, format: str, *args) -> None:
+        logging.debug("StreamProxy: " + format % args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    proxy: StreamProxy
+
+
+class StreamProxy:
+    """Serves service streams to mpv from 127.0.0.1.
+
+    Streams are split into blocks which are kept on disk, so seeking back and
+    replaying a track cost no upstream traffic. When the upstream URL expires
+    or is refused, the track is resolved again and the same format's new URL is
+    used from the same byte offset, so playback goes on.
+
+    With capturing enabled, a stream whose blocks are all on disk is also put
+    into the media cache as the track's native download.
+    """
+
+    block_size = 512 * 1024
+    retries = 3
+    # Resolve again this long before the URL's expiry time
+    expiry_margin = 60
+    # Streams that can be served at once, older ones are forgotten
+    max_streams = 16
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        config = bot.config.player
+        self.max_size = config.stream_cache_size * 1024 * 1024
+        self.directory = os.path.join(bot.media_cache.directory, "streams")
+        self.enabled = config.stream_proxy
+        self.media_cache = bot.media_cache
+        self.capture = bot.config.downloads.capture_streams and self.media_cache.enabled
+        self._streams: OrderedDict[str, _Stream] = OrderedDict()
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._server: Optional[_Server] = None
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._scan()
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        self._server = _Server(("127.0.0.1", 0), _RequestHandler)
+        self._server.proxy = self
+        threading.Thread(
+            target=self._server.serve_forever, daemon=True, name="StreamProxyThread"
+        ).start()
+        logging.debug(f"StreamProxy: Listening on port {self._server.server_port}")
+
+    def close(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        self._session.close()
+
+    def get_url(self, track: Track, url: str) -> str:
+        """Returns the proxied URL for a track, or the URL itself when the track
+        can't go through the proxy."""
+        if (
+            not self._server
+            or not track.service
+            or track.type != TrackType.Default
+            or not url.startswith("http")
+        ):
+            return url
+        video_id = track.get_video_id()
+        format_id = (track.extra_info or {}).get("format_id")
+        if not video_id or not format_id:
+            return url
+        key = hashlib.sha256(
+            f"{track.service}:{video_id}:{format_id}".encode("utf-8")
+        ).hexdigest()
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream:
+                stream.track = track
+                stream.url = url
+                self._streams.move_to_end(key)
+            else:
+                self._streams[key] = _Stream(key, track, url)
+                while len(self._streams) > self.max_streams:
+                    self._streams.popitem(last=False)
+        return f"http://127.0.0.1:{self._server.server_port}/{key}"
+
+    def handle(self, request: _RequestHandler, send_body: bool) -> None:
+        with self._lock:
+            stream = self._streams.get(request.path.strip("/"))
+        if not stream:
+            request.send_error(404)
+            return
+        start, end = 0, None
+        range_header = request.headers.get("Range")
+        match = re_range.fullmatch(range_header) if range_header else None
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else None
+        try:
+            size = self._get_size(stream, start)
+        except StreamError as e:
+            logging.error(f"StreamProxy: {stream.track.name}: {e}")
+            request.send_error(502)
+            return
+        if start >= size:
+            request.send_response(416)
+            request.send_header("Content-Range", f"bytes */{size}")
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return
+        end = min(end if end is not None else size - 1, size - 1)
+        request.send_response(206 if match else 200)
+        request.send_header("Accept-Ranges", "bytes")
+        request.send_header("Content-Type", "application/octet-stream")
+        request.send_header("Content-Length", str(end - start + 1))
+        if match:
+            request.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        request.end_headers()
+        if not send_body:
+            return
+        position = start
+        try:
+            while position <= end:
+                index = position // self.block_size
+                block = self._get_block(stream, index)
+                offset = position - index * self.block_size
+                data = block[offset : offset + end - position + 1]
+                if not data:
+                    raise StreamError(f"No data at {position}")
+                request.wfile.write(data)
+                position += len(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # mpv closes the connection when seeking
+            pass
+        except StreamError as e:
+            logging.error(f"StreamProxy: {stream.track.name}: {e}")
+            request.close_connection = True
+
+    def _get_size(self, stream: _Stream, position: int) -> int:
+        if stream.size is None:
+            self._get_block(stream, position // self.block_size)
+        if stream.size is None:
+            raise StreamError("Unknown stream size")
+        return stream.size
+
+    def _get_block(self, stream: _Stream, index: int) -> bytes:
+        path = os.path.join(self.directory, stream.key, str(index))
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            if stream.size is None:
+                stream.size = self._read_size(stream)
+            self._touch(stream.key)
+            return data
+        except OSError:
+            pass
+        if stream.data is not None:
+            data = stream.data[index * self.block_size : (index + 1) * self.block_size]
+        else:
+            data = self._fetch(stream, index)
+        if self.max_size > 0:
+            self._store(stream, path, data)
+        return data
+
+    def _fetch(self, stream: _Stream, index: int) -> bytes:
+        first = index * self.block_size
+        last = first + self.block_size - 1
+        if stream.size is not None:
+            last = min(last, stream.size - 1)
+        error: Optional[Exception] = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(attempt)
+            try:
+                with stream.lock:
+                    url = stream.url
+                    headers = stream.headers
+                if self._is_expired(url):
+                    url, headers = self._refresh(stream, url)
+                response = self._session.get(
+                    url,
+                    headers={**headers, "Range": f"bytes={first}-{last}"},
+                    timeout=(10, 30),
+                )
+                if response.status_code in (403, 410):
+                    # Expired or bound to another address, get a fresh URL
+                    logging.info(
+                        f"StreamProxy: Upstream returned {response.status_code} for {stream.track.name}, resolving again"
+                    )
+                    self._refresh(stream, url)
+                    continue
+                response.raise_for_status()
+                data = response.content
+                if response.status_code == 200:
+                    # Range not supported, the whole file came back. Later blocks
+                    # are cut from it instead of downloading it again each time
+                    stream.size = len(data)
+                    stream.data = data
+                    return data[first : last + 1]
+                match = re_content_range.match(response.headers.get("Content-Range", ""))
+                if match:
+                    stream.size = int(match.group(1))
+                if stream.size is not None:
+                    last = min(last, stream.size - 1)
+                if len(data) != last - first + 1:
+                    raise StreamError(f"Short read at {first}")
+                return data
+            except (requests.RequestException, StreamError) as e:
+                logging.warning(f"StreamProxy: Fetching block {index} failed: {e}")
+                error = e
+        raise StreamError(f"Failed to fetch block {index}: {error}")
+
+    def _is_expired(self, url: str) -> bool:
+        expire = parse_qs(urlparse(url).query).get("expire")
+        try:
+            return bool(expire) and int(expire[0]) - time.time() < self.expiry_margin
+        except ValueError:
+            return False
+
+    def _refresh(self, stream: _Stream, url: str) -> Tuple[str, Dict[str, str]]:
+        """Replaces an expired or refused URL, returning the current URL and headers.
+
+        Readers that hit the same URL share one resolve, and the stream's lock
+        is only taken to swap the result in, so blocks on disk keep being served.
+        """
+        with stream.lock:
+            if stream.url != url:
+                # Another reader already replaced it
+                return stream.url, stream.headers
+        new_url, headers = flights.do((stream.key, url), self._resolve, stream)
+        with stream.lock:
+            if stream.url == url:
+                stream.url = new_url
+                stream.headers = headers
+            return stream.url, stream.headers
+
+    def _resolve(self, stream: _Stream) -> Tuple[str, Dict[str, str]]:
+        extra_info = stream.track.extra_info or {}
+        page_url = extra_info.get("webpage_url") or extra_info.get("original_url")
+        if not page_url:
+            raise StreamError("The track can't be resolved again")
+        service = self.bot.service_manager.services[stream.track.service]
+        try:
+            info = (
+                flights.do(
+                    (stream.track.service, stream.track.get_video_id() or page_url, "stream"),
+                    service.get,
+                    page_url,
+                    process=True,
+                )[0].extra_info
+                or {}
+            )
+        except Exception as e:
+            raise StreamError(f"Failed to resolve: {e}")
+        # Byte offsets are only valid within the same format
+        for format in info.get("formats") or [info]:
+            if format.get("format_id") == stream.format_id and format.get("url"):
+                return format["url"], dict(format.get("http_headers") or stream.headers)
+        raise StreamError(f"Format {stream.format_id} is no longer offered")
+
+    def _store(self, stream: _Stream, path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path):
+            # Fetched by a concurrent request too
+            return
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        if stream.size is not None:
+            with open(os.path.join(directory, "size"), "w") as f:
+                f.write(str(stream.size))
+        with self._lock:
+            self._entries[stream.key] = self._entries.get(stream.key, 0) + len(data)
+            self._entries.move_to_end(stream.key)
+            self._size += len(data)
+            self._evict(keep=stream.key)
+        if self.capture and stream.size is not None and not stream.captured:
+            blocks = -(-stream.size // self.block_size)
+            if len(self._get_block_names(directory)) == blocks:
+                stream.captured = True
+                threading.Thread(
+                    target=self._capture, args=(stream, blocks), daemon=True
+                ).start()
+
+    def _capture(self, stream: _Stream, blocks: int) -> None:
+        ext = (stream.track.extra_info or {}).get("ext") or "webm"
+        try:
+            with tempfile.TemporaryDirectory(
+                dir=self.media_cache.directory, prefix=".tmp"
+            ) as temp_dir:
+                file_path = os.path.join(temp_dir, "track." + ext)
+                with open(file_path, "wb") as f:
+                    for index in range(blocks):
+                        with open(
+                            os.path.join(self.directory, stream.key, str(index)), "rb"
+                        ) as block:
+                            shutil.copyfileobj(block, f)
+                self.media_cache.add(stream.track, file_path, "native")
+            logging.info(f"StreamProxy: Captured {stream.track.name}")
+        except OSError as e:
+            # A block was evicted meanwhile
+            logging.warning(f"StreamProxy: Failed to capture {stream.track.name}: {e}")
+            stream.captured = False
+
+    def _get_block_names(self, directory: str) -> List[str]:
+        return [name for name in os.listdir(directory) if name.isdigit()]
+
+    def _read_size(self, stream: _Stream) -> Optional[int]:
+        try:
+            with open(os.path.join(self.directory, stream.key, "size")) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _touch(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def _evict(self, keep: str) -> None:
+        while self._size > self.max_size and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            self._size -= self._entries.pop(key)
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+    def _scan(self) -> None:
+        entries = []
+        for key in os.listdir(self.directory):
+            directory = os.path.join(self.directory, key)
+            if not os.path.isdir(directory):
+                continue
+            size = 0
+            mtime = 0.0
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if name.endswith(".tmp"):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                size += stat.st_size
+                mtime = max(mtime, stat.st_mtime)
+            entries.append((mtime, key, size))
+        # Least recently used first
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._size += size
+        if self._size > self.max_size and self._entries:
+            self._evict(keep=next(reversed(self._entries)))
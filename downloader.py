@@ -1,11 +1,202 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
 import requests
-import shutil
 
-def download_file(url: str, file_path: str) -> None:
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"}
-    with requests.get(url, headers=headers, stream=True) as r:
+headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"}
+# (connect, read) in seconds; the read timeout applies to each chunk, so slow but
+# alive transfers are fine while a stalled connection is dropped and resumed
+timeout = (10, 30)
+retries = 5
+retry_delay = 1.0
+chunk_size = 64 * 1024
+# Files at least this large are fetched in parallel ranges when the server allows it
+segmented_threshold = 16 * 1024 * 1024
+segments = 4
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+class DownloadError(Exception):
+    pass
+
+
+class _Progress:
+    def __init__(self, total: Optional[int], callback: Optional[ProgressCallback]) -> None:
+        self.total = total
+        self.callback = callback
+        self.downloaded = 0
+        self._lock = threading.Lock()
+
+    def add(self, count: int) -> None:
+        with self._lock:
+            self.downloaded += count
+            downloaded = self.downloaded
+        if self.callback:
+            self.callback(downloaded, self.total)
+
+    def reset(self, count: int) -> None:
+        with self._lock:
+            self.downloaded -= count
+
+
+def download_file(
+    url: str,
+    file_path: str,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> None:
+    part_path = file_path + ".part"
+    with requests.Session() as session:
+        session.headers.update(headers)
+        # Sizes are checked against Content-Length, so ask for the raw bytes
+        session.headers["Accept-Encoding"] = "identity"
+        size, accepts_ranges = _probe(session, url)
+        progress = _Progress(size, progress_callback)
         try:
-            with open(file_path, "wb") as f:
-                shutil.copyfileobj(r.raw, f)
-        except Exception as e:
-            print(f"An error occurred while downloading the file: {e}")
+            if size and accepts_ranges and size >= segmented_threshold:
+                _download_segmented(session, url, part_path, size, progress)
+            else:
+                _download_single(session, url, part_path, accepts_ranges, progress)
+            actual_size = os.path.getsize(part_path)
+            if size is not None and actual_size != size:
+                raise DownloadError(
+                    f"Size mismatch for {url}: expected {size} bytes, got {actual_size}"
+                )
+            os.replace(part_path, file_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+
+def _probe(session: requests.Session, url: str) -> Tuple[Optional[int], bool]:
+    try:
+        with session.head(url, allow_redirects=True, timeout=timeout) as r:
+            if r.status_code >= 400:
+                return None, False
+            encoding = r.headers.get("Content-Encoding", "identity")
+            length = r.headers.get("Content-Length")
+            # A compressed body has no relation to the size on disk
+            size = int(length) if length and length.isdigit() and encoding == "identity" else None
+            return size, r.headers.get("Accept-Ranges", "").lower() == "bytes"
+    except requests.RequestException as e:
+        logging.debug(f"Downloader: HEAD request failed for {url}: {e}")
+        return None, False
+
+
+def _download_single(
+    session: requests.Session,
+    url: str,
+    file_path: str,
+    accepts_ranges: bool,
+    progress: _Progress,
+) -> None:
+    written = 0
+    with open(file_path, "wb") as f:
+        for attempt in range(retries + 1):
+            request_headers = {}
+            if written and accepts_ranges:
+                request_headers["Range"] = f"bytes={written}-"
+            try:
+                with session.get(
+                    url, headers=request_headers, stream=True, timeout=timeout
+                ) as r:
+                    r.raise_for_status()
+                    if written and r.status_code != 206:
+                        # The server ignored the range, so start over
+                        f.seek(0)
+                        f.truncate()
+                        progress.reset(written)
+                        written = 0
+                    for chunk in r.iter_content(chunk_size):
+                        f.write(chunk)
+                        written += len(chunk)
+                        progress.add(len(chunk))
+                if progress.total is None or written >= progress.total:
+                    return
+                raise requests.ConnectionError(
+                    f"Connection closed at byte {written} of {progress.total}"
+                )
+            except requests.RequestException as e:
+                _handle_failure(url, attempt, e)
+
+
+def _download_segmented(
+    session: requests.Session,
+    url: str,
+    file_path: str,
+    size: int,
+    progress: _Progress,
+) -> None:
+    with open(file_path, "wb") as f:
+        f.truncate(size)
+    segment_length = -(-size // segments)
+    ranges: List[Tuple[int, int]] = [
+        (start, min(start + segment_length, size) - 1)
+        for start in range(0, size, segment_length)
+    ]
+    with ThreadPoolExecutor(
+        max_workers=len(ranges), thread_name_prefix="SegmentDownloader"
+    ) as executor:
+        futures = [
+            executor.submit(_download_range, session, url, file_path, start, end, progress)
+            for start, end in ranges
+        ]
+        for future in futures:
+            future.result()
+
+
+def _download_range(
+    session: requests.Session,
+    url: str,
+    file_path: str,
+    start: int,
+    end: int,
+    progress: _Progress,
+) -> None:
+    position = start
+    with open(file_path, "r+b") as f:
+        for attempt in range(retries + 1):
+            try:
+                with session.get(
+                    url,
+                    headers={"Range": f"bytes={position}-{end}"},
+                    stream=True,
+                    timeout=timeout,
+                ) as r:
+                    r.raise_for_status()
+                    if r.status_code != 206:
+                        raise DownloadError(f"Range requests are not honoured by {url}")
+                    f.seek(position)
+                    for chunk in r.iter_content(chunk_size):
+                        chunk = chunk[: end + 1 - position]
+                        f.write(chunk)
+                        position += len(chunk)
+                        progress.add(len(chunk))
+                if position > end:
+                    return
+                raise requests.ConnectionError(
+                    f"Connection closed at byte {position} of range {start}-{end}"
+                )
+            except requests.RequestException as e:
+                _handle_failure(url, attempt, e)
+
+
+def _handle_failure(url: str, attempt: int, error: Exception) -> None:
+    response = getattr(error, "response", None)
+    permanent = (
+        response is not None
+        and response.status_code < 500
+        and response.status_code not in (408, 429)
+    )
+    if permanent or attempt >= retries:
+        raise DownloadError(f"Failed to download {url}: {error}") from error
+    delay = retry_delay * 2**attempt
+    logging.warning(
+        f"Downloader: {error}, retrying in {delay:.0f}s ({attempt + 1}/{retries})"
+    )
+    time.sleep(delay)
@@ -0,0 +1,585 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+import http.cookiejar
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# YoutubeDL instances a worker keeps for reuse, one per distinct set of options
+max_instances = 4
+recommendations_headers = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/111.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+class ResolveError(Exception):
+    pass
+
+
+class ResolverBusyError(ResolveError):
+    """No worker became free within the call's timeout."""
+
+
+# Requests are handled in the process that runs them. In a worker they come one
+# at a time, so YoutubeDL instances and HTTP clients are kept warm between them.
+_warm = False
+_instances: "OrderedDict[str, Tuple[Any, Optional[str]]]" = OrderedDict()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+_http_clients: Dict[Tuple[str, float], Any] = {}
+_ytmusic: Any = None
+
+
+def _get_mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def _copy_cookies(cookiefile: str) -> Optional[str]:
+    # yt-dlp writes its cookie jar back on close, so it only gets a copy
+    if not cookiefile or not os.path.isfile(cookiefile):
+        return None
+    path = os.path.join(
+        tempfile.gettempdir(), f"yt_cookies_{os.getpid()}_{uuid.uuid4().hex}.txt"
+    )
+    shutil.copy2(cookiefile, path)
+    return path
+
+
+def _remove(path: Optional[str]) -> None:
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError as e:
+        logging.debug(f"Resolver: Failed to remove {path}: {e}")
+
+
+@contextmanager
+def _youtube_dl(
+    options: Dict[str, Any], cookiefile: str, reuse: bool = True
+) -> Iterator[Any]:
+    from yt_dlp import YoutubeDL
+
+    if reuse and _warm:
+        key = json.dumps([options, cookiefile, _get_mtime(cookiefile)], sort_keys=True)
+        if key in _instances:
+            _instances.move_to_end(key)
+            ydl = _instances[key][0]
+        else:
+            cookie_copy = _copy_cookies(cookiefile)
+            ydl = YoutubeDL(
+                dict(options, logger=logging.getLogger(), cookiefile=cookie_copy)
+            )
+            _instances[key] = (ydl, cookie_copy)
+            while len(_instances) > max_instances:
+                # Not closed, that would only save the cookies of the copy
+                _remove(_instances.popitem(last=False)[1][1])
+        yield ydl
+        return
+    cookie_copy = _copy_cookies(cookiefile)
+    try:
+        with YoutubeDL(
+            dict(options, logger=logging.getLogger(), cookiefile=cookie_copy)
+        ) as ydl:
+            yield ydl
+    finally:
+        _remove(cookie_copy)
+
+
+def _is_reference(info: Dict[str, Any]) -> bool:
+    info_type = info.get("_type")
+    return info_type == "playlist" or (info_type == "url" and not info.get("ie_key"))
+
+
+def extract(
+    options: Dict[str, Any],
+    cookiefile: str,
+    url: str,
+    info: Optional[Dict[str, Any]] = None,
+    process: bool = False,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Returns the unprocessed info for url, or the given info, and the
+    processed stream when process is set and the info is a single video."""
+    try:
+        with _youtube_dl(options, cookiefile) as ydl:
+            if info is None:
+                info = ydl.extract_info(url, process=False)
+                if info is None:
+                    raise ResolveError("Failed to extract video info")
+            stream = None
+            if process and not _is_reference(info):
+                stream = ydl.process_ie_result(info)
+    except ResolveError:
+        raise
+    except Exception as e:
+        raise ResolveError(str(e) or type(e).__name__) from e
+    return info, stream
+
+
+def download(options: Dict[str, Any], cookiefile: str, url: str) -> Optional[str]:
+    """Downloads url and returns the final file, postprocessors may change the extension."""
+    try:
+        # Every download has its own output template, so nothing to reuse
+        with _youtube_dl(options, cookiefile, reuse=False) as ydl:
+            info = ydl.extract_info(url, download=True)
+    except Exception as e:
+        raise ResolveError(str(e) or type(e).__name__) from e
+    try:
+        return info["requested_downloads"][0]["filepath"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True).start()
+        return _loop
+
+
+def search_videos(query: str, limit: int) -> List[Dict[str, Any]]:
+    from py_yt.search import VideosSearch
+
+    search_obj = VideosSearch(query, limit=limit)
+    search = asyncio.run_coroutine_threadsafe(search_obj.next(), _get_loop()).result()
+    # Structure is {'result': [Items...]}
+    if not search or "result" not in search:
+        return []
+    return search["result"] or []
+
+
+def search_songs(query: str, limit: int) -> List[Dict[str, Any]]:
+    global _ytmusic
+    from ytmusicapi import YTMusic
+
+    with _lock:
+        if _ytmusic is None:
+            # Search is public, no cookies
+            _ytmusic = YTMusic()
+    return _ytmusic.search(query, filter="songs", limit=limit)
+
+
+def _get_http_client(cookiefile: str) -> Any:
+    import httpx
+
+    key = (cookiefile, _get_mtime(cookiefile))
+    with _lock:
+        client = _http_clients.get(key)
+        if client:
+            return client
+        jar = None
+        if cookiefile and os.path.isfile(cookiefile):
+            try:
+                jar = http.cookiejar.MozillaCookieJar(cookiefile)
+                jar.load(ignore_discard=True, ignore_expires=True)
+                logging.info(f"[YT] Recommendations: Loaded cookies from {cookiefile}")
+            except Exception as e:
+                logging.warning(f"[YT] Recommendations: Could not load cookies from {cookiefile}: {e}")
+                jar = None
+        for old_client in _http_clients.values():
+            old_client.close()
+        _http_clients.clear()
+        client = httpx.Client(http2=True, follow_redirects=True, timeout=10.0, cookies=jar)
+        _http_clients[key] = client
+        return client
+
+
+def recommendations(
+    video_id: str, cookiefile: str, limit: int
+) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """Returns (video ID, name, item) of the videos YouTube recommends next to video_id."""
+    logging.info(f"[YT] Fetching recommendations for {video_id}")
+    url = f"https://www.youtube.com/watch?v={video_id}"
+    response = _get_http_client(cookiefile).get(url, headers=recommendations_headers)
+    if response.status_code != 200:
+        logging.error(f"[YT] Recommendations fetch failed: HTTP {response.status_code}")
+        return []
+
+    pattern = r"var ytInitialData = ({.*?});"
+    match = re.search(pattern, response.text)
+    if not match:
+        pattern = r"window\[['\"]ytInitialData['\"].*? = ({.*?});"
+        match = re.search(pattern, response.text)
+
+    if not match:
+        logging.error("[YT] Recommendations fetch failed: Could not find ytInitialData")
+        return []
+
+    data = json.loads(match.group(1))
+
+    # Extract both compactVideoRenderer and lockupViewModel items
+    items = []
+
+    def find_videos_and_lockups(obj):
+        if isinstance(obj, dict):
+            if "compactVideoRenderer" in obj:
+                items.append(("video", obj["compactVideoRenderer"]))
+            elif "lockupViewModel" in obj:
+                items.append(("lockup", obj["lockupViewModel"]))
+            else:
+                for v in obj.values():
+                    find_videos_and_lockups(v)
+        elif isinstance(obj, list):
+            for item in obj:
+                find_videos_and_lockups(item)
+
+    try:
+        find_videos_and_lockups(data)
+    except Exception as ex:
+        logging.debug(f"[YT] Recursive search error: {ex}")
+
+    results = []
+    for kind, item in items:
+        if len(results) >= limit:
+            break
+        if not item or not isinstance(item, dict):
+            continue
+
+        v_id = None
+        title = ""
+        channel = ""
+
+        if kind == "video":
+            v_id = item.get("videoId")
+            if not v_id:
+                continue
+            title_obj = item.get("title", {})
+            if "simpleText" in title_obj:
+                title = title_obj["simpleText"]
+            elif "runs" in title_obj and isinstance(title_obj["runs"], list) and len(title_obj["runs"]) > 0:
+                title = title_obj["runs"][0].get("text", "")
+
+            channel_obj = item.get("longBylineText", {}) or item.get("shortBylineText", {})
+            if "runs" in channel_obj and isinstance(channel_obj["runs"], list) and len(channel_obj["runs"]) > 0:
+                channel = channel_obj["runs"][0].get("text", "")
+
+        elif kind == "lockup":
+            v_id = item.get("contentId")
+            # Filter out anything that is not a video/playlist (e.g. channels)
+            content_type = item.get("contentType")
+            if content_type != "LOCKUP_CONTENT_TYPE_VIDEO":
+                continue
+            if not v_id:
+                continue
+
+            metadata = item.get("metadata", {}).get("lockupMetadataViewModel", {})
+            title = metadata.get("title", {}).get("content", "")
+
+            rows = metadata.get("metadata", {}).get("contentMetadataViewModel", {}).get("metadataRows", [])
+            if len(rows) > 0:
+                parts = rows[0].get("metadataParts", [])
+                if len(parts) > 0:
+                    txt_obj = parts[0].get("text", {})
+                    if isinstance(txt_obj, dict):
+                        channel = txt_obj.get("content", "")
+                    elif isinstance(txt_obj, str):
+                        channel = txt_obj
+
+        if not v_id:
+            continue
+
+        full_title = f"{title} - {channel}" if channel else title
+        results.append((v_id, full_title, item))
+    return results
+
+
+handlers: Dict[str, Callable[..., Any]] = {
+    "extract": extract,
+    "download": download,
+    "search_videos": search_videos,
+    "search_songs": search_songs,
+    "recommendations": recommendations,
+}
+
+
+_dropped = object()
+
+
+def _compact(value: Any) -> Any:
+    """Turns a value into plain JSON data.
+
+    yt-dlp's private keys, which hold callbacks, are left out along with
+    anything else that isn't data, and lazy playlist entries are read out.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        compact = {}
+        for key, item in value.items():
+            if not isinstance(key, str) or key.startswith("__"):
+                continue
+            item = _compact(item)
+            if item is not _dropped:
+                compact[key] = item
+        return compact
+    if isinstance(value, Iterable) and not isinstance(value, (bytes, bytearray)):
+        return [item for item in map(_compact, value) if item is not _dropped]
+    return _dropped
+
+
+# Worker process side. Requests are JSON lines [operation, arguments] on stdin,
+# answers are ["ok", result] or ["error", message] on stdout, and log records
+# are sent in between as ["log", level, message].
+
+
+class _PipeHandler(logging.Handler):
+    def __init__(self, send: Callable[[List[Any]], None]) -> None:
+        super().__init__()
+        self.send = send
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.send(["log", record.levelno, self.format(record)])
+        except Exception:
+            self.handleError(record)
+
+
+def _serve() -> None:
+    global _warm
+    _warm = True
+    # stdout belongs to the protocol, anything else printed goes to stderr
+    output = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    send_lock = threading.Lock()
+
+    def send(message: List[Any]) -> None:
+        line = json.dumps(message, separators=(",", ":"))
+        with send_lock:
+            output.write(line + "\n")
+            output.flush()
+
+    level = int(sys.argv[1]) if len(sys.argv) > 1 else logging.WARNING
+    logging.basicConfig(level=level, format="%(message)s", handlers=[_PipeHandler(send)])
+    # Pay for the imports once, before the first request
+    import yt_dlp  # noqa: F401
+
+    for line in sys.stdin:
+        try:
+            operation, arguments = json.loads(line)
+            result = handlers[operation](*arguments)
+            response = ["ok", _compact(result)]
+        except Exception as e:
+            response = ["error", str(e) or type(e).__name__]
+        send(response)
+    for _, cookie_copy in _instances.values():
+        _remove(cookie_copy)
+
+
+# Bot side
+
+
+class _Worker:
+    def __init__(self, pool: "ResolverPool", index: int) -> None:
+        self.pool = pool
+        self.index = index
+        self._future: Optional["Future[Any]"] = None
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self) -> None:
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                str(logging.getLogger().getEffectiveLevel()),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        threading.Thread(
+            target=self._read,
+            args=(self.process,),
+            daemon=True,
+            name=f"{self.pool.name}Reader{self.index}",
+        ).start()
+
+    def submit(self, operation: str, arguments: List[Any]) -> "Future[Any]":
+        future: "Future[Any]" = Future()
+        line = json.dumps([operation, _compact(arguments)], separators=(",", ":"))
+        with self._lock:
+            self._future = future
+            try:
+                self.process.stdin.write(line + "\n")
+                self.process.stdin.flush()
+            except OSError:
+                # The process is gone, the reader fails the call once it sees that
+                pass
+        return future
+
+    def close(self) -> None:
+        # The worker exits at the end of its input, after the request it's on
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+    def kill(self, future: "Future[Any]") -> None:
+        """Stops the process if it's still on the call for future.
+
+        The reader then restarts it and frees the worker.
+        """
+        with self._lock:
+            if self._future is not future:
+                return
+            logging.warning(f"{self.pool.name} {self.index}: Call timed out, killing the process")
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+
+    def _read(self, process: subprocess.Popen) -> None:
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message[0] == "log":
+                logging.log(message[1], f"{self.pool.name} {self.index}: {message[2]}")
+            else:
+                self._finish(message)
+        process.wait()
+        if self.pool.closed:
+            self._finish(["error", "Resolver closed"])
+            return
+        logging.warning(
+            f"{self.pool.name} {self.index}: Process exited with code {process.returncode}, restarting"
+        )
+        with self._lock:
+            self._start()
+        self._finish(["error", "Resolver process exited"])
+
+    def _finish(self, message: List[Any]) -> None:
+        with self._lock:
+            future, self._future = self._future, None
+        if future is None:
+            return
+        if message[0] == "ok":
+            future.set_result(message[1])
+        else:
+            future.set_exception(ResolveError(message[1]))
+        # The worker is free again even if whoever asked has stopped waiting
+        self.pool.release(self)
+
+
+class ResolverPool:
+    """Runs resolver operations in worker processes, away from the bot's GIL.
+
+    Each worker is this module run as a script, handling one request at a time.
+    The first warm workers start with the pool, the rest up to processes are
+    started when a call finds none free and kept from then on. With no processes
+    the operations run in the calling thread instead.
+    """
+
+    def __init__(
+        self, processes: int, name: str = "Resolver", warm: Optional[int] = None
+    ) -> None:
+        self.processes = max(processes, 0)
+        self.warm = self.processes if warm is None else min(max(warm, 0), self.processes)
+        self.name = name
+        self.closed = False
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._workers_lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self) -> None:
+        if not self.processes:
+            return
+        for _ in range(self.warm):
+            self._idle.put(self._add_worker())
+        logging.info(
+            f"{self.name}: Up to {self.processes} worker process(es), {self.warm} started"
+        )
+
+    def _add_worker(self) -> _Worker:
+        with self._workers_lock:
+            worker = _Worker(self, len(self._workers))
+            self._workers.append(worker)
+        return worker
+
+    def _get_worker(self, timeout: Optional[float]) -> _Worker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._workers_lock:
+            grow = len(self._workers) < self.processes
+        if grow:
+            worker = self._add_worker()
+            logging.debug(f"{self.name}: Started worker process {worker.index}")
+            return worker
+        try:
+            return self._idle.get(timeout=None if timeout is None else max(timeout, 0))
+        except queue.Empty:
+            raise ResolverBusyError(f"No free {self.name.lower()} within {timeout:.1f}s")
+
+    @property
+    def has_idle_worker(self) -> bool:
+        """Whether a call would start right away on a warm worker."""
+        return not self.processes or not self._idle.empty()
+
+    def get_work_time(self) -> float:
+        """Seconds the last call from this thread ran, without waiting for a worker."""
+        return getattr(self._local, "work_time", 0.0)
+
+    def call(self, operation: str, *arguments: Any, timeout: Optional[float] = None) -> Any:
+        """Runs an operation and returns its result.
+
+        With a timeout, ResolverBusyError is raised when no worker becomes free in
+        time and ResolveError when the operation doesn't finish in time.
+        """
+        start_time = time.perf_counter()
+        if not self.processes:
+            try:
+                return handlers[operation](*arguments)
+            finally:
+                self._local.work_time = time.perf_counter() - start_time
+        if self.closed:
+            raise ResolveError("Resolver closed")
+        worker = self._get_worker(timeout)
+        work_start = time.perf_counter()
+        future = worker.submit(operation, list(arguments))
+        try:
+            if timeout is None:
+                return future.result()
+            return future.result(max(start_time + timeout - work_start, 0))
+        except FutureTimeoutError:
+            # Nobody waits for the result anymore, so the worker is freed right away
+            worker.kill(future)
+            raise ResolveError(f"{operation} timed out after {timeout:.1f}s")
+        finally:
+            self._local.work_time = time.perf_counter() - work_start
+
+    def release(self, worker: _Worker) -> None:
+        self._idle.put(worker)
+
+    def close(self) -> None:
+        self.closed = True
+        with self._workers_lock:
+            workers = list(self._workers)
+        for worker in workers:
+            worker.close()
+
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,26 @@
+import os
+import sys
+import unittest
+
+
+cd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, cd)
+
+from bot.TeamTalk.sender import split
+
+
+class SplitTest(unittest.TestCase):
+    def test_leading_empty_lines(self) -> None:
+        self.assertEqual(split("\n\n" + "a" * 300), ["a" * 256, "a" * 44])
+
+    def test_empty_line_at_chunk_start(self) -> None:
+        self.assertEqual(split("a" * 256 + "\n\nb"), ["a" * 256, "b"])
+
+    def test_no_separator_at_chunk_start(self) -> None:
+        for chunk in split("\n".join(["word " * 40] * 10)):
+            self.assertLessEqual(len(chunk), 256)
+            self.assertFalse(chunk.startswith(("\n", " ")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import timeit
+
+
+cd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, cd)
+
+from bot.TeamTalk.sender import split
+
+
+def help_text(commands: int) -> str:
+    return "\n".join(
+        f"cmd{i} ARGUMENT Does something useful with the argument and reports back to the user"
+        for i in range(commands)
+    )
+
+
+def track_list(tracks: int) -> str:
+    return "\n".join(
+        f"{i + 1}: Артист {i} — Очень длинное название трека номер {i} (Official Video)"
+        for i in range(tracks)
+    )
+
+
+def long_line(words: int) -> str:
+    return " ".join(f"word{i}" for i in range(words))
+
+
+cases = {
+    "help, 60 commands": help_text(60),
+    "help, 600 commands": help_text(600),
+    "track list, 100 tracks": track_list(100),
+    "track list, 1000 tracks": track_list(1000),
+    "single line, 5000 words": long_line(5000),
+    "single word, 100000 chars": "x" * 100000,
+}
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for name, text in cases.items():
+        chunks = len(split(text))
+        seconds = min(timeit.repeat(lambda: split(text), number=number, repeat=5))
+        print(
+            f"{name}: {len(text)} chars, {chunks} chunks, {seconds / number * 1e6:.1f} us per call"
+        )
+
+
+if __name__ == "__main__":
+    main()